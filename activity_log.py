@@ -0,0 +1,148 @@
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+INSERT_ACTIVITY_SQL = '''
+    INSERT INTO user_activity (user_id, user_name, user_role, action, ip_address, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+
+class ActivityLogWriter:
+    """Background writer that batches user_activity inserts.
+
+    Requests only put a tuple on a bounded in-process queue; a daemon thread
+    drains it and writes each batch with executemany() in one transaction,
+    once ``batch_size`` events are waiting or ``flush_interval`` seconds have
+    passed. Events are dropped (and counted) rather than blocking a request
+    when the queue is full.
+    """
+
+    def __init__(self, connect, max_queue=10000, batch_size=200, flush_interval=0.5):
+        self.connect = connect
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._thread = None
+        self._stopping = False
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+    def _ensure_started(self):
+        # The thread is started lazily and again after a fork, since gunicorn
+        # workers do not inherit the parent's threads.
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            self._pid = os.getpid()
+            self._queue = queue.Queue(maxsize=self.max_queue)
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='activity-log-writer', daemon=True)
+            self._thread.start()
+
+    def enqueue(self, user_id, user_name, user_role, action, ip_address=None):
+        """Queue one event; returns False if it had to be dropped"""
+        self._ensure_started()
+        # Same format as CURRENT_TIMESTAMP, captured when the event happened
+        timestamp = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+        try:
+            self._queue.put_nowait((user_id, user_name, user_role, action, ip_address, timestamp))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.enqueued += 1
+        return True
+
+    def flush(self, timeout=5.0):
+        """Block until everything queued so far has been written"""
+        if self._thread is None or self._pid != os.getpid():
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        """Flush pending events and stop the writer thread (used at exit)"""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self.flush(timeout)
+        self._stopping = True
+        self._thread.join(timeout)
+
+    def _collect(self):
+        # Wait for a first event, then keep collecting until the batch is full
+        # or the flush interval has elapsed.
+        batch = []
+        markers = []
+        try:
+            item = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return batch, markers
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            if isinstance(item, threading.Event):
+                markers.append(item)
+                break
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+        return batch, markers
+
+    def _write(self, batch):
+        conn = None
+        try:
+            conn = self.connect()
+            conn.executemany(INSERT_ACTIVITY_SQL, batch)
+            conn.commit()
+            with self._lock:
+                self.written += len(batch)
+                self.batches += 1
+        except Exception as e:
+            with self._lock:
+                self.failed += len(batch)
+            print(f"Error writing activity batch: {e}")
+        finally:
+            if conn:
+                conn.close()
+
+    def _run(self):
+        while not (self._stopping and self._queue.empty()):
+            batch, markers = self._collect()
+            if batch:
+                self._write(batch)
+            for marker in markers:
+                marker.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enqueued': self.enqueued,
+                'written': self.written,
+                'dropped': self.dropped,
+                'failed': self.failed,
+                'batches': self.batches,
+                'queued': self._queue.qsize() if self._queue is not None else 0,
+                'max_queue': self.max_queue,
+            }
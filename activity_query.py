@@ -0,0 +1,133 @@
+from itertools import combinations
+
+from report_query import date_bound, decode_cursor, encode_cursor
+
+# Equality filters of the activity query API, mapped to their column. Every
+# combination of them has a composite index ending in (timestamp, id), so a
+# filtered page is an index range scan already in timestamp order.
+EQUALITY_FILTERS = {
+    'user_id': 'user_id',
+    'role': 'user_role',
+    'action': 'action',
+}
+
+INTEGER_FILTERS = {'user_id'}
+
+# Short index names per column
+INDEX_NAMES = {'user_id': 'user', 'user_role': 'role', 'action': 'action'}
+
+ACTIVITY_INDEXES = [('idx_user_activity_timestamp', '(timestamp, id)')] + [
+    (
+        'idx_user_activity_' + '_'.join(INDEX_NAMES[column] for column in columns) + '_time',
+        '(' + ', '.join(columns) + ', timestamp, id)',
+    )
+    for size in range(1, len(EQUALITY_FILTERS) + 1)
+    for columns in combinations(EQUALITY_FILTERS.values(), size)
+]
+
+# ?action_prefix= is a range over the action index (LOGIN_FAILED_ <= action
+# < LOGIN_FAILED`), which no index can return in timestamp order. Next to an
+# equality filter it is only checked on that filter's rows. On its own, a
+# prefix matching many rows is cheaper to check while walking the timestamp
+# index until a page is filled than to sort every match, so past this many
+# matches the action index is left out of the plan.
+DENSE_PREFIX_ROWS = 2000
+
+
+def create_activity_indexes(cursor):
+    """Create the indexes backing activity filters and keyset pagination"""
+    for name, columns in ACTIVITY_INDEXES:
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON user_activity {columns}')
+
+
+def prefix_upper_bound(prefix):
+    """Smallest string greater than every string starting with ``prefix``"""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def prefix_is_dense(conn, prefix):
+    """True when ``prefix`` matches at least DENSE_PREFIX_ROWS rows (index-only count)"""
+    row = conn.execute('''
+        SELECT COUNT(*) FROM (
+            SELECT 1 FROM user_activity WHERE action >= ? AND action < ? LIMIT ?
+        )
+    ''', (prefix, prefix_upper_bound(prefix), DENSE_PREFIX_ROWS)).fetchone()
+    return row[0] >= DENSE_PREFIX_ROWS
+
+
+def has_equality_filter(args):
+    return any(args.get(arg) and args.get(arg) != 'all' for arg in EQUALITY_FILTERS)
+
+
+def build_activity_query(args, limit=None, dense_prefix=False):
+    """Build the activity query for the given filters and cursor, newest first.
+
+    With ``dense_prefix``, or next to an equality filter, the action index is
+    kept out of the plan for the ?action_prefix= filter (see DENSE_PREFIX_ROWS).
+    """
+    clauses = []
+    params = []
+
+    for arg, column in EQUALITY_FILTERS.items():
+        value = args.get(arg)
+        if value and value != 'all':
+            if arg in INTEGER_FILTERS:
+                try:
+                    value = int(value)
+                except ValueError:
+                    raise ValueError(f'{arg} must be an integer')
+            clauses.append(f'{column} = ?')
+            params.append(value)
+
+    # A range instead of LIKE 'prefix%' so the action index can be used;
+    # the unary + stops SQLite from choosing that index
+    action_prefix = args.get('action_prefix')
+    if action_prefix:
+        column = '+action' if dense_prefix or has_equality_filter(args) else 'action'
+        clauses.append(f'{column} >= ? AND {column} < ?')
+        params.extend([action_prefix, prefix_upper_bound(action_prefix)])
+
+    date_from = args.get('from')
+    if date_from:
+        clauses.append('timestamp >= ?')
+        params.append(date_bound(date_from))
+
+    date_to = args.get('to')
+    if date_to:
+        clauses.append('timestamp <= ?')
+        params.append(date_bound(date_to, end_of_day=True))
+
+    cursor_token = args.get('cursor')
+    if cursor_token:
+        timestamp, activity_id = decode_cursor(cursor_token)
+        clauses.append('(timestamp, id) < (?, ?)')
+        params.extend([timestamp, activity_id])
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+    sql = f'''
+        SELECT * FROM user_activity
+        {where}
+        ORDER BY timestamp DESC, id DESC
+    '''
+    if limit is not None:
+        sql += ' LIMIT ?'
+        params.append(limit)
+    return sql, params
+
+
+def fetch_activity_page(conn, args, limit):
+    """Fetch one page of activity, newest first, using keyset pagination.
+
+    Returns ``(rows, next_cursor)``; ``next_cursor`` is None on the last page.
+    """
+    action_prefix = args.get('action_prefix')
+    dense_prefix = bool(action_prefix) and not has_equality_filter(args) and prefix_is_dense(conn, action_prefix)
+    sql, params = build_activity_query(args, limit + 1, dense_prefix)
+    rows = conn.execute(sql, params).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last['timestamp'], last['id'])
+    return rows, next_cursor
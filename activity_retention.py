@@ -0,0 +1,150 @@
+import gzip
+import json
+import os
+import re
+import time
+from datetime import datetime, timedelta
+
+# LOGIN_THROTTLED rows summarise several rejected attempts as '... x<count>'
+THROTTLED_COUNT = re.compile(r' x(\d+)$')
+
+
+def create_activity_retention(cursor):
+    """Timestamp index for recent-activity queries and the hourly roll-up table"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_activity_timestamp ON user_activity (timestamp, id)')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_activity_hourly (
+            hour TEXT NOT NULL,
+            action TEXT NOT NULL,
+            user_role TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (hour, action, user_role)
+        )
+    ''')
+
+
+def action_kind(action):
+    """Action without its details (LOGIN_FAILED_PIN:PIN:1234 -> LOGIN_FAILED_PIN),
+    so the roll-up stays small"""
+    return action.split(':', 1)[0]
+
+
+def action_count(action):
+    """Attempts a row stands for: the x<count> of a LOGIN_THROTTLED summary, else 1"""
+    if action_kind(action) == 'LOGIN_THROTTLED':
+        match = THROTTLED_COUNT.search(action)
+        if match:
+            return int(match.group(1))
+    return 1
+
+
+def retention_cutoff(days):
+    """user_activity timestamp (UTC) before which rows are rolled up"""
+    return (datetime.utcnow() - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+class ActivityArchive:
+    """Gzip-compressed NDJSON file the pruned rows are appended to.
+
+    Each batch is flushed and fsynced before the rows are deleted, so a
+    crash can at worst archive a batch twice, never lose one.
+    """
+
+    def __init__(self, folder, cutoff):
+        os.makedirs(folder, exist_ok=True)
+        stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S')
+        self.path = os.path.join(folder, f'user_activity-before-{cutoff[:10]}-{stamp}.ndjson.gz')
+        self._raw = open(self.path, 'ab')
+        self._gzip = gzip.GzipFile(fileobj=self._raw, mode='ab')
+
+    def write(self, rows):
+        for row in rows:
+            self._gzip.write(json.dumps(dict(row), separators=(',', ':')).encode('utf-8') + b'\n')
+        self._gzip.flush()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+
+    def close(self):
+        self._gzip.close()
+        self._raw.close()
+
+
+def prune_activity(conn, cutoff, archive_folder=None, batch_size=500, pause=0.05):
+    """Roll up, archive and delete user_activity rows older than ``cutoff``.
+
+    Rows are handled ``batch_size`` at a time, oldest first, each batch in
+    its own short transaction with a ``pause`` in between so request-path
+    writers are never blocked for long. Returns ``(rows_pruned, archive_path)``.
+    """
+    archive = ActivityArchive(archive_folder, cutoff) if archive_folder else None
+    pruned = 0
+    try:
+        while True:
+            rows = conn.execute('''
+                SELECT * FROM user_activity
+                WHERE timestamp < ?
+                ORDER BY timestamp, id
+                LIMIT ?
+            ''', (cutoff, batch_size)).fetchall()
+            if not rows:
+                break
+
+            if archive:
+                archive.write(rows)
+
+            counts = {}
+            for row in rows:
+                key = (str(row['timestamp'])[:13] + ':00', action_kind(row['action']), row['user_role'] or 'Unknown')
+                counts[key] = counts.get(key, 0) + action_count(row['action'])
+
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.executemany('''
+                    INSERT INTO user_activity_hourly (hour, action, user_role, count) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(hour, action, user_role) DO UPDATE SET count = count + excluded.count
+                ''', [key + (count,) for key, count in counts.items()])
+                conn.executemany('DELETE FROM user_activity WHERE id = ?', [(row['id'],) for row in rows])
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+            pruned += len(rows)
+            if len(rows) < batch_size:
+                break
+            time.sleep(pause)
+    finally:
+        if archive:
+            archive.close()
+
+    # Hand the freed WAL pages back to the filesystem
+    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    if archive and not pruned:
+        os.remove(archive.path)
+        return pruned, None
+    return pruned, archive.path if archive else None
+
+
+def hourly_activity(conn, date_from=None, date_to=None, action=None, by_day=False):
+    """Rolled-up activity counts, per hour (or per day with ``by_day``)"""
+    period = 'substr(hour, 1, 10)' if by_day else 'hour'
+    sql = f'SELECT {period} AS period, action, user_role, SUM(count) AS count FROM user_activity_hourly'
+    conditions = []
+    params = []
+    if date_from:
+        conditions.append('hour >= ?')
+        params.append(date_from)
+    if date_to:
+        conditions.append('hour <= ?')
+        # A bare date includes every hour of that day
+        params.append(date_to + ' 23:59' if len(date_to) == 10 else date_to)
+    if action:
+        conditions.append('action = ?')
+        params.append(action)
+    if conditions:
+        sql += ' WHERE ' + ' AND '.join(conditions)
+    sql += ' GROUP BY period, action, user_role ORDER BY period, action, user_role'
+    return [
+        {'period': row[0], 'action': row[1], 'user_role': row[2], 'count': row[3]}
+        for row in conn.execute(sql, params)
+    ]
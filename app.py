@@ -1,16 +1,54 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, send_from_directory
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, send_from_directory, send_file, make_response, abort, g
+from werkzeug.security import generate_password_hash, check_password_hash, safe_join
 from werkzeug.utils import secure_filename
-from datetime import datetime
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import partial
 import os
 import sqlite3
 import json
+import hashlib
+import atexit
+import mimetypes
+import time
+import click
+import csv
 
 from config import Config
+from activity_log import ActivityLogWriter, INSERT_ACTIVITY_SQL
+from activity_query import build_activity_query, create_activity_indexes, fetch_activity_page
+from activity_retention import create_activity_retention, hourly_activity, prune_activity, retention_cutoff
+from db import ConnectionPool, add_column_if_missing, create_data_version_triggers, get_data_version
+from file_cleanup import FileDeleter
+from image_jobs import ImageJobRunner, process_image
+from report_bulk import bulk_delete, bulk_resolve, parse_report_ids
+from report_clusters import ClusterIndex, parse_zoom
+from report_export import REPORT_EXPORT_COLUMNS, EXPORT_FORMATS, export_chunks, export_filename, parse_export_format
+from report_query import build_report_query, create_report_indexes, fetch_report_page, parse_limit
+from streaming import requested_stream_format, stream_csv, stream_rows
+from image_store import UploadError, collect_orphans, create_image_refs, is_unreferenced, pin_image, release_image, save_image
+from thumbnails import THUMBNAIL_FORMATS, get_thumbnail, thumbnail_path, thumbnails_available
+from auth_engine import AuthEngine, PinBackend, RfidBackend, credentials_from
+from pin_index import PinIndex
+from events import EVENT_TRIGGERS, EventHub, create_event_log, format_sse, parse_event_types
+from search import SEARCH_SOURCES, create_search_index, rebuild_search_index, search
+from report_stats import create_report_stats, daily_counts, rebuild_report_stats, resolve_time_stats, status_counts
+from rate_limit import MemoryBucketStore, SQLiteBucketStore, ThrottleSummary, TokenBucketLimiter, retry_after_header
+from rfid_shell import RfidShell, negotiate_encoding
+from spatial import create_spatial_index, find_nearby_pending, parse_bbox, register_functions
+from teacher_roster import EXPORT_COLUMNS, MATCH_KEYS, import_roster, read_roster
 
 app = Flask(__name__)
 app.config.from_object(Config)
 
+db_pool = ConnectionPool(
+    pragmas=app.config['DB_PRAGMAS'],
+    max_idle=app.config['DB_POOL_MAX_IDLE'],
+    statement_cache_size=app.config['DB_STATEMENT_CACHE_SIZE'],
+    timeout=app.config['DB_BUSY_TIMEOUT_MS'] / 1000.0,
+    on_connect=register_functions,
+)
+
 # Initialize database
 def init_db():
     conn = sqlite3.connect(app.config['DATABASE'])
@@ -37,6 +75,9 @@ def init_db():
         )
     ''')
     
+    # Background image processing status: queued, done, failed or skipped
+    add_column_if_missing(cursor, 'hazard_reports', 'processing_state', 'TEXT')
+    
     # Create admin table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS admin (
@@ -60,6 +101,10 @@ def init_db():
         )
     ''')
     
+    # PIN lookups (the in-process index reloads when this version moves)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_teacher_keys_pin ON teacher_keys (pin, status)")
+    create_data_version_triggers(cursor, 'teacher_keys')
+    
     # Create user_activity table for monitoring
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS user_activity (
@@ -74,6 +119,29 @@ def init_db():
         )
     ''')
     
+    # Create report_attachments table (duplicate submissions merged into a report)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS report_attachments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            report_id INTEGER NOT NULL,
+            before_image TEXT,
+            description TEXT,
+            latitude REAL,
+            longitude REAL,
+            date_attached DATETIME NOT NULL,
+            user_id INTEGER,
+            user_name TEXT,
+            user_role TEXT,
+            rfid_code TEXT,
+            FOREIGN KEY (report_id) REFERENCES hazard_reports (id)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_report_attachments_report ON report_attachments (report_id)')
+    add_column_if_missing(cursor, 'report_attachments', 'processing_state', 'TEXT')
+    
+    # Reference counts for content-addressed before/after images
+    create_image_refs(cursor)
+    
     # Create feedback table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS feedback (
@@ -89,27 +157,99 @@ def init_db():
         )
     ''')
     
+    # Indexes backing report filters and keyset pagination
+    create_report_indexes(cursor)
+    
+    # R*Tree over report coordinates for bbox/near queries
+    create_spatial_index(cursor)
+    
+    # Version counter used for ETags on report listings
+    create_data_version_triggers(cursor, 'hazard_reports')
+    
+    # Trigger-maintained dashboard statistics (see report_stats.py)
+    create_report_stats(cursor)
+    
+    # FTS5 indexes over report descriptions and feedback messages
+    create_search_index(cursor)
+    
+    # Change feed behind /api/events
+    create_event_log(cursor)
+    
+    # Timestamp index and hourly roll-up for user_activity retention
+    create_activity_retention(cursor)
+    
+    # Indexes backing the /api/user-activity filters
+    create_activity_indexes(cursor)
+    
     conn.commit()
     conn.close()
 
 def get_db_connection():
-    """Get database connection with proper error handling"""
-    conn = sqlite3.connect(app.config['DATABASE'], timeout=10.0)
-    conn.row_factory = sqlite3.Row
-    # Enable WAL mode for better concurrency
-    conn.execute('PRAGMA journal_mode=WAL')
-    return conn
+    """Get a pooled database connection (close() returns it to the pool)"""
+    return db_pool.connect(app.config['DATABASE'])
+
+activity_writer = ActivityLogWriter(
+    get_db_connection,
+    max_queue=app.config['ACTIVITY_LOG_MAX_QUEUE'],
+    batch_size=app.config['ACTIVITY_LOG_BATCH_SIZE'],
+    flush_interval=app.config['ACTIVITY_LOG_FLUSH_INTERVAL'],
+)
+atexit.register(activity_writer.close)
+
+image_jobs = ImageJobRunner(
+    mode=app.config['IMAGE_JOB_EXECUTOR'],
+    max_workers=app.config['IMAGE_JOB_WORKERS'],
+    start_method=app.config['IMAGE_JOB_START_METHOD'],
+)
+atexit.register(image_jobs.shutdown)
+
+# Map marker clusters, cached per tile until hazard_reports changes
+cluster_index = ClusterIndex(
+    grid=app.config['CLUSTER_GRID'],
+    cache_size=app.config['CLUSTER_CACHE_SIZE'],
+    max_tiles=app.config['CLUSTER_MAX_TILES'],
+)
+
+# Image and screenshot files are unlinked off the request thread
+file_deleter = FileDeleter()
+atexit.register(file_deleter.close)
+
+# Active PINs kept in memory; see pin_index.py for cross-worker staleness checks
+pin_index = PinIndex(lambda: sqlite3.connect(app.config['DATABASE'], check_same_thread=False))
+
+# Per-worker fan-out of event_log rows to /api/events streams
+event_hub = EventHub(
+    lambda: sqlite3.connect(app.config['DATABASE'], check_same_thread=False),
+    poll_interval=app.config['EVENTS_POLL_INTERVAL'],
+    max_subscribers=app.config['EVENTS_MAX_SUBSCRIBERS'],
+    retention=app.config['EVENTS_RETENTION'],
+)
+
+rfid_shell = RfidShell(
+    os.path.join(app.root_path, 'static', 'rfid', 'RFID.html'),
+    os.path.join(app.root_path, 'static', 'rfid', 'assets'),
+)
+# Compressed siblings are written here (and by flask precompress-assets),
+# never while a request waits. A read-only static folder only means the
+# uncompressed files are served.
+try:
+    rfid_shell.precompress_assets()
+except OSError as e:
+    print(f"Could not precompress RFID assets: {e}")
 
 def log_user_activity(user_id, user_name, user_role, action, ip_address=None):
-    """Log user activity for monitoring"""
+    """Log user activity for monitoring (queued for the background writer)"""
+    if app.config['ACTIVITY_LOG_ASYNC']:
+        activity_writer.enqueue(user_id, user_name, user_role, action, ip_address)
+        return
+    
     conn = None
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO user_activity (user_id, user_name, user_role, action, ip_address)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (user_id, user_name, user_role, action, ip_address))
+        conn.execute(INSERT_ACTIVITY_SQL, (
+            user_id, user_name, user_role, action, ip_address,
+            datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+        ))
         conn.commit()
     except Exception as e:
         print(f"Error logging activity: {e}")
@@ -117,6 +257,210 @@ def log_user_activity(user_id, user_name, user_role, action, ip_address=None):
         if conn:
             conn.close()
 
+def read_upload_request(image_field):
+    """Split an upload request into (form data, image source).
+    
+    Accepts multipart/form-data (the image as a file part), a raw image body
+    (image/* content type, other fields in the query string) or the legacy
+    JSON body carrying the image as a base64 data URL.
+    """
+    if request.mimetype == 'multipart/form-data':
+        return request.form.to_dict(), request.files.get(image_field)
+    if request.mimetype.startswith('image/'):
+        return request.args.to_dict(), request.stream
+    data = request.json
+    return data, data.get(image_field)
+
+def store_image(source, folder):
+    """Stream an uploaded image into the ``folder`` upload folder and return
+    its content-addressed filename.
+    
+    The file is pinned in image_refs until the request ends, so cleaning up
+    an identical photo elsewhere cannot remove it before this request's rows
+    reference it.
+    """
+    def pin(filename):
+        conn = get_db_connection()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            pin_image(conn, folder, filename)
+            conn.commit()
+        finally:
+            conn.close()
+        g.setdefault('pinned_images', []).append((folder, filename))
+    
+    filename, _, _ = save_image(
+        source,
+        image_folders()[folder],
+        app.config['ALLOWED_EXTENSIONS'],
+        app.config['MAX_CONTENT_LENGTH'],
+        before_replace=pin
+    )
+    return filename
+
+@app.teardown_request
+def release_pinned_images(exc):
+    """Drop the request's pins; uploads no row ended up using are removed"""
+    pinned = g.pop('pinned_images', [])
+    if not pinned:
+        return
+    conn = get_db_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        orphans = []
+        for folder, filename in pinned:
+            orphans.extend(release_image(conn, folder, filename))
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"Error releasing uploaded images: {e}")
+        return
+    finally:
+        conn.close()
+    remove_orphaned_images(orphans)
+
+def image_folders():
+    """Upload folders for report images, keyed by their URL name"""
+    return {
+        'before': app.config['UPLOAD_FOLDER_BEFORE'],
+        'after': app.config['UPLOAD_FOLDER_AFTER'],
+    }
+
+@contextmanager
+def image_still_unreferenced(folder, filename):
+    """Yield whether an image is still unreferenced, holding the write lock
+    so no upload can pin it until the caller has unlinked it"""
+    conn = get_db_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        yield is_unreferenced(conn, folder, filename)
+    finally:
+        conn.rollback()
+        conn.close()
+
+def remove_orphaned_images(orphans):
+    """Unlink image files (and their thumbnails) whose last reference has gone"""
+    folders = image_folders()
+    for folder, filename in orphans:
+        paths = [os.path.join(folders[folder], filename)]
+        for width in app.config['THUMBNAIL_WIDTHS']:
+            for fmt in THUMBNAIL_FORMATS:
+                paths.append(thumbnail_path(app.config['THUMBNAIL_FOLDER'], folder, filename, width, fmt))
+        # Checked again when the deleter gets to it: an identical upload may
+        # have been stored since
+        file_deleter.delete(paths, guard=partial(image_still_unreferenced, folder, filename))
+
+def remove_map_screenshots(filenames):
+    file_deleter.delete(
+        os.path.join(app.config['UPLOAD_FOLDER_MAP_SCREENSHOTS'], filename) for filename in filenames
+    )
+
+def queue_image_processing(report_ids, folder, column, filename, table='hazard_reports'):
+    """Hand a stored image, shared by the ``table`` rows ``report_ids``, to the
+    background image workers"""
+    source_path = os.path.join(image_folders()[folder], filename)
+    
+    def on_success(new_filename):
+        finish_image_processing(report_ids, folder, column, filename, new_filename, 'done', table)
+    
+    def on_error(error):
+        print(f"Error processing image for {table} {report_ids}: {error}")
+        finish_image_processing(report_ids, folder, column, filename, filename, 'failed', table)
+    
+    return image_jobs.submit(process_image, (
+        source_path,
+        image_folders()[folder],
+        app.config['THUMBNAIL_FOLDER'],
+        folder,
+        app.config['THUMBNAIL_WIDTHS'],
+        app.config['IMAGE_QUALITY'],
+        app.config['IMAGE_MAX_DIMENSION']
+    ), on_success, on_error)
+
+def finish_image_processing(report_ids, folder, column, old_filename, new_filename, state, table='hazard_reports'):
+    """Point the reports (or attachments) at their processed image and record the outcome"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        # Only swap the image if a row still uses the one we processed
+        cursor.executemany(f'''
+            UPDATE {table} SET {column} = ?, processing_state = ?
+            WHERE id = ? AND {column} = ?
+        ''', [(new_filename, state, report_id, old_filename) for report_id in report_ids])
+        orphans = collect_orphans(cursor, [(folder, old_filename), (folder, new_filename)])
+        conn.commit()
+    finally:
+        conn.close()
+    remove_orphaned_images(orphans)
+
+@app.template_global()
+def thumbnail_urls(report, width=None):
+    """Thumbnail URLs per image and format, e.g. urls['before']['webp']"""
+    width = width or app.config['THUMBNAIL_LIST_WIDTH']
+    urls = {}
+    for folder, column in (('before', 'before_image'), ('after', 'after_image')):
+        if report[column]:
+            urls[folder] = {
+                fmt: url_for('report_thumbnail', folder=folder, width=width, fmt=fmt, filename=report[column])
+                for fmt in THUMBNAIL_FORMATS
+            }
+    return urls
+
+def report_page(args, limit):
+    """One keyset page of reports as dicts (with thumbnail URLs) and the next cursor"""
+    conn = get_db_connection()
+    try:
+        reports, next_cursor = fetch_report_page(conn, args, limit)
+    finally:
+        conn.close()
+    
+    reports_list = []
+    for report in reports:
+        report_dict = dict(report)
+        report_dict['thumbnails'] = thumbnail_urls(report)
+        reports_list.append(report_dict)
+    return reports_list, next_cursor
+
+def report_status_counts():
+    """Report totals per status, read from the trigger-maintained summary table"""
+    conn = get_db_connection()
+    try:
+        return status_counts(conn)
+    finally:
+        conn.close()
+
+def listing_etag(table, *parts):
+    """Strong ETag for a listing of ``table``, derived from its data version"""
+    conn = get_db_connection()
+    try:
+        version = get_data_version(conn, table)
+    finally:
+        conn.close()
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()[:16]
+    return f'{table}-{version}-{digest}'
+
+def not_modified(etag):
+    """Return a 304 response if the client already holds ``etag``"""
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    return None
+
+def with_etag(response, etag):
+    """Attach ``etag`` so browsers revalidate instead of re-downloading"""
+    response = make_response(response)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def vary_on_accept(response):
+    """Mark a response whose body depends on the Accept header (NDJSON or JSON)"""
+    response = make_response(response)
+    response.vary.add('Accept')
+    return response
+
 @app.route('/')
 def index():
     # Check if user is already authenticated via RFID/PIN
@@ -142,7 +486,23 @@ def clear_session():
 
 @app.route('/static/rfid/assets/<path:filename>')
 def serve_rfid_assets(filename):
-    return send_from_directory(os.path.join('static', 'rfid', 'assets'), filename)
+    """Serve hashed SPA assets, pre-compressed when the client accepts it"""
+    path = safe_join(rfid_shell.assets_dir, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    
+    send_path, encoding = negotiate_encoding(path, request.accept_encodings)
+    max_age = app.config['RFID_ASSET_MAX_AGE']
+    response = send_file(
+        send_path,
+        mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+        max_age=max_age
+    )
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = f'public, max-age={max_age}, immutable'
+    return response
 
 @app.route('/rfid-login')
 def rfid_login():
@@ -150,121 +510,113 @@ def rfid_login():
     if 'user_logged_in' in session and 'user_id' in session:
         return redirect(url_for('index'))
     
-    # Read RFID.html and replace asset paths with Flask URLs
-    with open(os.path.join('static', 'rfid', 'RFID.html'), 'r') as f:
-        content = f.read()
-    
-    # Replace relative asset paths with Flask static URLs
-    content = content.replace(
-        './assets/index-BHz0ethL.js',
-        url_for('static', filename='rfid/assets/index-BHz0ethL.js')
-    ).replace(
-        './assets/index-CSlSh7T3.css',
-        url_for('static', filename='rfid/assets/index-CSlSh7T3.css')
-    )
+    # RFID.html is rendered once and re-read only when its mtime changes
+    return rfid_shell.render(lambda name: url_for('serve_rfid_assets', filename=name))
+
+def audit_login(result, client_ip):
+    """Audit hook for the auth engine: one user_activity row per attempt"""
+    if result.success:
+        log_user_activity(result.user['id'], result.user['name'], result.user['role'], result.audit_action, client_ip)
+    else:
+        log_user_activity(0, 'Unknown', 'Unknown', result.audit_action, client_ip)
+
+# One authentication path for every PIN/RFID endpoint; cards scanned through
+# /api/rfid/log-scan belong to students
+pin_backend = PinBackend(pin_index)
+auth_engine = AuthEngine([pin_backend, RfidBackend()], audit=audit_login)
+student_auth_engine = AuthEngine([pin_backend, RfidBackend(label='Student', role='Student')], audit=audit_login)
+
+if app.config['AUTH_RATE_LIMIT_STORE'] == 'sqlite':
+    login_buckets = SQLiteBucketStore(app.config['AUTH_RATE_LIMIT_DB'])
+else:
+    login_buckets = MemoryBucketStore()
+login_ip_limiter = TokenBucketLimiter(app.config['AUTH_IP_RATE'], app.config['AUTH_IP_BURST'], login_buckets)
+login_credential_limiter = TokenBucketLimiter(
+    app.config['AUTH_CREDENTIAL_RATE'], app.config['AUTH_CREDENTIAL_BURST'], login_buckets
+)
+
+def log_throttled_logins(client_ip, key, count):
+    log_user_activity(0, 'Unknown', 'Unknown', f'LOGIN_THROTTLED:{key} x{count}', client_ip)
+
+# Rejected attempts become one summary row per client and key per interval
+throttle_summary = ThrottleSummary(log_throttled_logins, interval=app.config['AUTH_THROTTLE_SUMMARY_INTERVAL'])
+atexit.register(throttle_summary.flush)
+
+def admit_login(engine, credentials):
+    """Spend login tokens for this client and credential.
+    
+    Returns None when the attempt may go ahead, otherwise the number of
+    seconds to send as Retry-After.
+    """
+    if not app.config['AUTH_RATE_LIMIT_ENABLED']:
+        return None
     
-    return content
+    client_ip = request.remote_addr
+    throttle_summary.maybe_flush()
+    key = 'ip'
+    allowed, retry_after = login_ip_limiter.hit(f'ip:{client_ip}')
+    if allowed:
+        key = engine.credential_key(credentials)
+        if key is None:
+            return None
+        allowed, retry_after = login_credential_limiter.hit(f'credential:{key}')
+    if allowed:
+        return None
+    
+    throttle_summary.record(client_ip, key)
+    return retry_after
+
+def too_many_attempts(body, retry_after):
+    response = jsonify(body)
+    response.status_code = 429
+    response.headers['Retry-After'] = retry_after_header(retry_after)
+    return response
+
+def login_with(engine, credentials):
+    """Authenticate the request's PIN/RFID and start the user session"""
+    result = engine.authenticate(credentials, request.remote_addr)
+    if result.success:
+        if app.config['AUTH_RATE_LIMIT_ENABLED']:
+            # Only failed attempts count against the client's address, so a
+            # shared school network is not locked out by successful logins
+            login_ip_limiter.refund(f'ip:{request.remote_addr}')
+        session['user_logged_in'] = True
+        session['user_id'] = result.user['id']
+        session['user_name'] = result.user['name']
+        session['user_role'] = result.user['role']
+        if result.method == 'RFID':
+            session['rfid_card'] = result.user['rfid_card']
+    return result
+
+def teacher_payload(result):
+    return {
+        'id': result.user['id'],
+        'name': result.user['name'],
+        'role': result.user['role']
+    }
 
 @app.route('/rfid-authenticate', methods=['POST'])
 def rfid_authenticate():
     """Handle RFID/PIN authentication"""
-    print(f"DEBUG: rfid_authenticate called with data: {request.json}")  # Debug print
     try:
-        data = request.json
-        pin = data.get('pin')
-        rfid = data.get('rfid')  # Accept RFID data
-        
-        print(f"DEBUG: Received PIN: {pin}, RFID: {rfid}")  # Debug print
+        credentials = credentials_from(request.get_json(silent=True))
+        retry_after = admit_login(auth_engine, credentials)
+        if retry_after is not None:
+            return too_many_attempts({'success': False, 'error': 'Too many attempts, try again later'}, retry_after)
         
-        # Get client IP for logging
-        client_ip = request.remote_addr
-        user_info = None
-        auth_method = None
-        
-        # Check for PIN authentication (teachers)
-        if pin:
-            print(f"DEBUG: Checking PIN {pin} in database")  # Debug print
-            conn = get_db_connection()
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM teacher_keys WHERE pin = ? AND status = 'active'", (pin,))
-            teacher = cursor.fetchone()
-            conn.close()
-            
-            print(f"DEBUG: Database query result: {teacher}")  # Debug print
-            
-            if teacher:
-                user_info = teacher
-                auth_method = 'PIN'
-                print(f"DEBUG: PIN authentication successful for {teacher['name']}")
-        
-        # Check for RFID authentication (any RFID card)
-        elif rfid:
-            print(f"DEBUG: Checking RFID {rfid}")  # Debug print
-            # Accept any RFID format (XX:XX:XX:XX)
-            if ':' in rfid and len(rfid.split(':')) == 4:
-                user_info = {
-                    'id': 0,  # Special ID for RFID users
-                    'name': f'RFID User ({rfid})',
-                    'role': 'RFID User',
-                    'pin': rfid
-                }
-                auth_method = 'RFID'
-                print(f"DEBUG: RFID authentication successful for {rfid}")
-            else:
-                print(f"DEBUG: Invalid RFID format: {rfid}")
-        
-        if user_info:
-            print(f"DEBUG: Setting user session for {user_info['name']}")
-            # Set user session
-            session['user_logged_in'] = True
-            session['user_id'] = user_info['id']
-            session['user_name'] = user_info['name']
-            session['user_role'] = user_info['role']
-            if auth_method == 'RFID':
-                session['rfid_card'] = user_info['pin']
-            
-            # Log successful authentication
-            log_user_activity(
-                user_info['id'], 
-                user_info['name'], 
-                user_info['role'], 
-                f'LOGIN_SUCCESS_{auth_method}',
-                client_ip
-            )
-            
-            response_data = {
+        result = login_with(auth_engine, credentials)
+        if result.success:
+            return jsonify({
                 'success': True,
-                'teacher': {
-                    'id': user_info['id'],
-                    'name': user_info['name'],
-                    'role': user_info['role']
-                },
+                'teacher': teacher_payload(result),
                 'redirect': url_for('index')
-            }
-            print(f"DEBUG: Returning success response: {response_data}")
-            return jsonify(response_data)
-        else:
-            print(f"DEBUG: Authentication failed for RFID: {rfid}")
-            # Log failed authentication attempt
-            auth_data = rfid if rfid else f'PIN:{pin}'
-            log_user_activity(
-                0, 
-                'Unknown', 
-                'Unknown', 
-                f'LOGIN_FAILED_{auth_method}:{auth_data}',
-                client_ip
-            )
-            
-            response_data = {
-                'success': False,
-                'error': 'Invalid authentication'
-            }
-            print(f"DEBUG: Returning failure response: {response_data}")
-            return jsonify(response_data)
-            
+            })
+        return jsonify({
+            'success': False,
+            'error': 'Invalid authentication'
+        })
     except Exception as e:
-        print(f"Error in rfid_authenticate: {str(e)}")  # Debug print
+        print(f"Error in rfid_authenticate: {str(e)}")
         return jsonify({'success': False, 'error': f'Server error: {str(e)}'}), 500
 
 @app.route('/user-logout')
@@ -290,35 +642,228 @@ def user_logout():
 
 @app.route('/api/user-activity')
 def get_user_activity():
-    """Get user activity logs for admin monitoring"""
+    """Get user activity logs for admin monitoring, newest first.
+    
+    Supports ?user_id=, ?role=, ?action= (exact), ?action_prefix= (e.g.
+    LOGIN_FAILED_), ?from=, ?to=, ?limit= and the ?cursor= token returned
+    as next_cursor by the previous page. Every filter is served by a
+    composite index ending in (timestamp, id). With ?format=ndjson or
+    ?stream=1 every matching row is streamed instead.
+    """
     if 'admin_logged_in' not in session:
         return jsonify({'error': 'Unauthorized'}), 401
     
     try:
+        stream_format = requested_stream_format(request)
+        if stream_format:
+            # Streaming exports default to the whole (filtered) log
+            limit = parse_limit(request.args, None, None)
+            sql, params = build_activity_query(request.args, limit)
+            conn = get_db_connection()
+            try:
+                cursor = conn.execute(sql, params)
+            except Exception:
+                conn.close()
+                raise
+            return vary_on_accept(stream_rows(conn, cursor, stream_format, 'activities'))
+        
+        limit = parse_limit(request.args, app.config['ACTIVITY_PAGE_SIZE'], app.config['ACTIVITY_MAX_PAGE_SIZE'])
         conn = get_db_connection()
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT * FROM user_activity 
-            ORDER BY timestamp DESC 
-            LIMIT 100
-        ''')
-        activities = cursor.fetchall()
+        try:
+            activities, next_cursor = fetch_activity_page(conn, request.args, limit)
+        finally:
+            conn.close()
+        
+        return vary_on_accept(jsonify({
+            'success': True,
+            'activities': [dict(activity) for activity in activities],
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        }))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error in get_user_activity: {str(e)}")
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+
+@app.route('/api/user-activity/hourly')
+def get_user_activity_hourly():
+    """Rolled-up activity counts for periods already pruned from user_activity.
+    
+    ?from= and ?to= bound the hours, ?action= picks one action kind and
+    ?by=day sums the hours per day.
+    """
+    if 'admin_logged_in' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    conn = get_db_connection()
+    try:
+        return jsonify({
+            'success': True,
+            'activity': hourly_activity(
+                conn,
+                request.args.get('from'),
+                request.args.get('to'),
+                request.args.get('action'),
+                by_day=request.args.get('by') == 'day'
+            )
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
         conn.close()
+
+def live_events_supported():
+    """True when requests are served on threads (gunicorn gthread, the dev server).
+    
+    Each /api/events stream holds its request thread open, so with sync
+    workers the admin pages poll /api/stats and /api/user-activity instead.
+    """
+    return bool(request.environ.get('wsgi.multithread'))
+
+@app.route('/api/events')
+def stream_events():
+    """Server-Sent Events feed of new reports, resolutions and user activity.
+    
+    ?types= takes a comma-separated subset of event types. Browsers resume
+    after a reconnect by sending Last-Event-ID, and missed events are
+    replayed first.
+    """
+    if 'admin_logged_in' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    try:
+        types = parse_event_types(request.args.get('types'), EVENT_TRIGGERS)
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    subscription = event_hub.subscribe(types, last_event_id)
+    if subscription is None:
+        response = jsonify({'error': 'Too many event streams, try again later'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '30'
+        return response
+    
+    heartbeat = app.config['EVENTS_HEARTBEAT_SECONDS']
+    deadline = time.monotonic() + app.config['EVENTS_STREAM_MAX_SECONDS']
+    
+    def generate():
+        try:
+            yield 'retry: 3000\n\n'
+            # An overflowed subscriber is dropped and resumes via Last-Event-ID
+            while not subscription.overflowed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                event = subscription.get(min(heartbeat, remaining))
+                yield format_sse(event) if event else ': keepalive\n\n'
+        finally:
+            event_hub.unsubscribe(subscription)
+    
+    response = app.response_class(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/api/diagnostics')
+def get_diagnostics():
+    """Expose internal counters for admin monitoring"""
+    if 'admin_logged_in' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    return jsonify({
+        'success': True,
+        'db_pool': db_pool.stats(),
+        'activity_log': activity_writer.stats(),
+        'image_jobs': image_jobs.stats(),
+        'file_deleter': file_deleter.stats(),
+        'pin_index': pin_index.stats(),
+        'clusters': cluster_index.stats(),
+        'events': event_hub.stats(),
+        'login_throttle': {
+            'ip': login_ip_limiter.stats(),
+            'credential': login_credential_limiter.stats(),
+            'summary': throttle_summary.stats()
+        }
+    })
+
+@app.route('/api/stats')
+def get_stats():
+    """Dashboard statistics read from the trigger-maintained summary tables.
+    
+    ?days= limits the per-day series (default 30). Never scans hazard_reports.
+    """
+    if 'admin_logged_in' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    try:
+        days = int(request.args.get('days', 30))
+        if days < 1 or days > 3660:
+            raise ValueError('days must be between 1 and 3660')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    etag = listing_etag('hazard_reports', 'stats', days)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    conn = get_db_connection()
+    try:
+        return with_etag(jsonify({
+            'success': True,
+            'by_status': status_counts(conn),
+            'daily': daily_counts(conn, days),
+            'time_to_resolve': resolve_time_stats(conn)
+        }), etag)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        conn.close()
+
+@app.route('/api/search')
+def search_text():
+    """Ranked full-text search over report descriptions and feedback.
+    
+    ?q= is the query (words are ANDed, "quoted text" is a phrase),
+    ?source= is reports (default), feedback or all, and pages are selected
+    with ?limit= and the ?offset= returned as next_offset. Matches are
+    wrapped in <mark> in the (HTML-escaped) highlight and snippet fields.
+    """
+    if 'admin_logged_in' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    try:
+        source = request.args.get('source', 'reports')
+        if source == 'all':
+            sources = list(SEARCH_SOURCES)
+        elif source in SEARCH_SOURCES:
+            sources = [source]
+        else:
+            raise ValueError(f'Unknown search source: {source}')
+        limit = parse_limit(request.args, app.config['SEARCH_PAGE_SIZE'], app.config['SEARCH_MAX_PAGE_SIZE'])
+        offset = int(request.args.get('offset', 0))
+        if offset < 0:
+            raise ValueError('offset must not be negative')
         
-        # Convert Row objects to dictionaries for JSON serialization
-        activity_list = []
-        for activity in activities:
-            activity_dict = dict(activity)
-            activity_list.append(activity_dict)
+        conn = get_db_connection()
+        try:
+            hits, next_offset = search(conn, request.args.get('q'), sources, limit, offset)
+        finally:
+            conn.close()
         
         return jsonify({
             'success': True,
-            'activities': activity_list
+            'results': hits,
+            'next_offset': next_offset,
+            'has_more': next_offset is not None
         })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        print(f"Error in get_user_activity: {str(e)}")  # Debug print
-        return jsonify({'error': f'Database error: {str(e)}'}), 500
+        return jsonify({'error': str(e)}), 500
 
 @app.route('/history')
 def history():
@@ -326,12 +871,13 @@ def history():
     if ('user_logged_in' not in session or 'user_id' not in session) and 'admin_logged_in' not in session:
         return redirect(url_for('rfid_login'))
     
-    conn = get_db_connection()
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM hazard_reports ORDER BY date_reported DESC")
-    reports = cursor.fetchall()
-    conn.close()
+    # The first page is embedded in the page so it renders without a second request
+    reports, next_cursor = report_page({}, app.config['REPORTS_PAGE_SIZE'])
+    initial_page = {
+        'reports': reports,
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None
+    }
     
     # Log history page access
     log_user_activity(
@@ -342,7 +888,7 @@ def history():
         request.remote_addr
     )
     
-    return render_template('history.html', reports=reports)
+    return render_template('history.html', initial_page=initial_page)
 
 @app.route('/admin_login', methods=['GET', 'POST'])
 def admin_login():
@@ -372,7 +918,7 @@ def admin_login():
 def rfid_management():
     if 'admin_logged_in' not in session:
         return redirect(url_for('admin_login'))
-    return render_template('rfid_management.html')
+    return render_template('rfid_management.html', live_events=live_events_supported())
 
 @app.route('/admin/logout')
 def admin_logout():
@@ -387,14 +933,48 @@ def admin_dashboard():
     
     print(f"DEBUG: admin_dashboard accessed by user: {session.get('admin_username')}")  # Debug print
     
-    conn = get_db_connection()
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM hazard_reports ORDER BY date_reported DESC")
-    reports = cursor.fetchall()
-    conn.close()
+    # Pending flash messages must be rendered, so only revalidate without them
+    etag = None
+    if '_flashes' not in session:
+        etag = listing_etag('hazard_reports', 'admin_dashboard', session.get('admin_username'), live_events_supported())
+        cached = not_modified(etag)
+        if cached:
+            return cached
     
-    return render_template('admin_dashboard.html', reports=reports)
+    # Only the first page is rendered; later pages come from /admin/reports
+    reports, next_cursor = report_page({}, app.config['REPORTS_PAGE_SIZE'])
+    
+    page = render_template(
+        'admin_dashboard.html',
+        reports=reports,
+        next_cursor=next_cursor,
+        status_counts=report_status_counts(),
+        live_events=live_events_supported()
+    )
+    return with_etag(page, etag) if etag else page
+
+@app.route('/admin/reports')
+def admin_reports_page():
+    """Rendered report cards for one page of the admin dashboard.
+    
+    Takes the same filters and ?cursor= as /api/reports; the cursor for the
+    following page is returned in the X-Next-Cursor header.
+    """
+    if 'admin_logged_in' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    try:
+        limit = parse_limit(request.args, app.config['REPORTS_PAGE_SIZE'], app.config['REPORTS_MAX_PAGE_SIZE'])
+        reports, next_cursor = report_page(request.args, limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    response = make_response(render_template('admin_report_cards.html', reports=reports))
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
 
 @app.route('/admin/rfid')
 def admin_rfid_protected():
@@ -496,104 +1076,25 @@ def delete_feedback(feedback_id):
 @app.route('/api/rfid/log-scan', methods=['POST'])
 def log_rfid_scan():
     """Handle RFID scan logging (for frontend compatibility)"""
-    print(f"DEBUG: log_rfid_scan called with data: {request.json}")  # Debug print
     try:
-        data = request.json
-        # Accept both parameter names for compatibility
-        rfid = data.get('rfid') or data.get('card_id')
-        pin = data.get('pin') or data.get('teacher_pin')
-        
-        print(f"DEBUG: Received RFID: {rfid}, PIN: {pin}")  # Debug print
+        credentials = credentials_from(request.get_json(silent=True))
+        retry_after = admit_login(student_auth_engine, credentials)
+        if retry_after is not None:
+            return too_many_attempts({'valid': False, 'error': 'Too many attempts, try again later'}, retry_after)
         
-        # Get client IP for logging
-        client_ip = request.remote_addr
-        user_info = None
-        auth_method = None
-        
-        # Check for PIN authentication (teachers)
-        if pin:
-            print(f"DEBUG: Checking PIN {pin} in database")  # Debug print
-            conn = get_db_connection()
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM teacher_keys WHERE pin = ? AND status = 'active'", (pin,))
-            teacher = cursor.fetchone()
-            conn.close()
-            
-            print(f"DEBUG: Database query result: {teacher}")  # Debug print
-            
-            if teacher:
-                user_info = teacher
-                auth_method = 'PIN'
-                print(f"DEBUG: PIN authentication successful for {teacher['name']}")
-        
-        # Check for RFID authentication (students only)
-        elif rfid:
-            print(f"DEBUG: Checking RFID {rfid}")  # Debug print
-            # Accept any RFID format (XX:XX:XX:XX)
-            if ':' in rfid and len(rfid.split(':')) == 4:
-                user_info = {
-                    'id': 0,  # Special ID for RFID users
-                    'name': f'Student ({rfid})',  # Changed to Student
-                    'role': 'Student',  # Changed to Student role
-                    'pin': rfid
-                }
-                auth_method = 'RFID'
-                print(f"DEBUG: RFID authentication successful for student {rfid}")
-            else:
-                print(f"DEBUG: Invalid RFID format: {rfid}")
-        
-        if user_info:
-            print(f"DEBUG: Setting user session for {user_info['name']}")
-            # Set user session
-            session['user_logged_in'] = True
-            session['user_id'] = user_info['id']
-            session['user_name'] = user_info['name']
-            session['user_role'] = user_info['role']
-            if auth_method == 'RFID':
-                session['rfid_card'] = user_info['pin']
-            
-            # Log successful authentication
-            log_user_activity(
-                user_info['id'], 
-                user_info['name'], 
-                user_info['role'], 
-                f'LOGIN_SUCCESS_{auth_method}',
-                client_ip
-            )
-            
-            response_data = {
+        result = login_with(student_auth_engine, credentials)
+        if result.success:
+            return jsonify({
                 'valid': True,
-                'teacher': {
-                    'id': user_info['id'],
-                    'name': user_info['name'],
-                    'role': user_info['role']
-                },
+                'teacher': teacher_payload(result),
                 'redirect': url_for('index')
-            }
-            print(f"DEBUG: Returning success response: {response_data}")
-            return jsonify(response_data)
-        else:
-            print(f"DEBUG: Authentication failed for RFID: {rfid}")
-            # Log failed authentication attempt
-            auth_data = rfid if rfid else f'PIN:{pin}'
-            log_user_activity(
-                0, 
-                'Unknown', 
-                'Unknown', 
-                f'LOGIN_FAILED_{auth_method}:{auth_data}',
-                client_ip
-            )
-            
-            response_data = {
-                'valid': False,
-                'error': 'Invalid authentication'
-            }
-            print(f"DEBUG: Returning failure response: {response_data}")
-            return jsonify(response_data)
-            
+            })
+        return jsonify({
+            'valid': False,
+            'error': 'Invalid authentication'
+        })
     except Exception as e:
-        print(f"Error in log_rfid_scan: {str(e)}")  # Debug print
+        print(f"Error in log_rfid_scan: {str(e)}")
         return jsonify({'valid': False, 'error': f'Server error: {str(e)}'}), 500
 
 @app.route('/api/upload-map-screenshot', methods=['POST'])
@@ -641,6 +1142,39 @@ def uploaded_before_file(filename):
 def uploaded_after_file(filename):
     return send_from_directory(app.config['UPLOAD_FOLDER_AFTER'], filename)
 
+@app.route('/thumbs/<folder>/<int:width>/<fmt>/<path:filename>')
+def report_thumbnail(folder, width, fmt, filename):
+    """Serve a cached, resized derivative of a report image"""
+    folders = image_folders()
+    if folder not in folders or width not in app.config['THUMBNAIL_WIDTHS'] or fmt not in THUMBNAIL_FORMATS:
+        abort(404)
+    source_path = safe_join(folders[folder], filename)
+    if source_path is None or not os.path.isfile(source_path):
+        abort(404)
+    
+    original_url = url_for(f'uploaded_{folder}_file', filename=filename)
+    if not thumbnails_available():
+        return redirect(original_url)
+    
+    try:
+        path = get_thumbnail(
+            source_path,
+            app.config['THUMBNAIL_FOLDER'],
+            folder,
+            filename,
+            width,
+            fmt,
+            app.config['THUMBNAIL_QUALITY']
+        )
+    except Exception as e:
+        print(f"Error creating thumbnail for {filename}: {e}")
+        return redirect(original_url)
+    
+    # Derivatives are keyed by the content hash of their source, so they never change
+    response = send_file(path, mimetype=THUMBNAIL_FORMATS[fmt][1], max_age=app.config['THUMBNAIL_MAX_AGE'])
+    response.headers['Cache-Control'] = f"public, max-age={app.config['THUMBNAIL_MAX_AGE']}, immutable"
+    return response
+
 @app.route('/static/map_screenshots/<path:filename>')
 def serve_map_screenshot(filename):
     try:
@@ -655,39 +1189,44 @@ def resolve_hazard(report_id):
         return jsonify({'error': 'Unauthorized'}), 401
     
     try:
-        data = request.json
-        after_image_data = data.get('after_image')
+        data, after_image = read_upload_request('after_image')
         
-        if not after_image_data:
+        if after_image is None or after_image == '':
             return jsonify({'error': 'After image is required'}), 400
         
+        conn = get_db_connection()
+        try:
+            report = conn.execute("SELECT id FROM hazard_reports WHERE id = ?", (report_id,)).fetchone()
+        finally:
+            conn.close()
+        if not report:
+            return jsonify({'error': 'Report not found'}), 404
+        
         # Save after image
-        if after_image_data.startswith('data:image'):
-            header, base64_data = after_image_data.split(',', 1)
-            file_extension = header.split(';')[0].split('/')[1]
-            after_filename = f"resolved_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{file_extension}"
-            filepath = os.path.join(app.config['UPLOAD_FOLDER_AFTER'], after_filename)
-            
-            # Ensure directory exists
-            os.makedirs(app.config['UPLOAD_FOLDER_AFTER'], exist_ok=True)
-            
-            # Save file
-            import base64
-            with open(filepath, 'wb') as f:
-                f.write(base64.b64decode(base64_data))
-        else:
-            return jsonify({'error': 'Invalid image format'}), 400
+        try:
+            after_filename = store_image(after_image, 'after')
+        except UploadError as e:
+            return jsonify({'error': str(e)}), 400
         
         # Update database
         conn = get_db_connection()
         cursor = conn.cursor()
+        cursor.execute("SELECT after_image FROM hazard_reports WHERE id = ?", (report_id,))
+        previous = cursor.fetchone()
         cursor.execute('''
             UPDATE hazard_reports 
-            SET after_image = ?, status = 'Resolved', date_resolved = ?
+            SET after_image = ?, status = 'Resolved', date_resolved = ?, processing_state = ?
             WHERE id = ?
-        ''', (after_filename, datetime.now(), report_id))
+        ''', (after_filename, datetime.now(), 'queued' if image_jobs.available() else 'skipped', report_id))
+        # A report resolved again may leave its previous after image unreferenced
+        orphans = collect_orphans(cursor, [('after', previous['after_image'])]) if previous else []
         conn.commit()
         conn.close()
+        remove_orphaned_images(orphans)
+        
+        # EXIF stripping, recompression and thumbnails happen off the request thread
+        if previous and image_jobs.available():
+            queue_image_processing([report_id], 'after', 'after_image', after_filename)
         
         return jsonify({
             'success': True,
@@ -741,6 +1280,7 @@ def manage_teacher():
             ''', (data['name'], data['pin'], data['role'], data['status'], datetime.now()))
             conn.commit()
             conn.close()
+            pin_index.invalidate()
             
             return jsonify({
                 'success': True,
@@ -759,6 +1299,7 @@ def manage_teacher():
             ''', (data['name'], data['pin'], data['role'], data['status'], data['id']))
             conn.commit()
             conn.close()
+            pin_index.invalidate()
             
             return jsonify({
                 'success': True,
@@ -779,15 +1320,62 @@ def delete_teacher(teacher_id):
         cursor.execute("DELETE FROM teacher_keys WHERE id = ?", (teacher_id,))
         conn.commit()
         conn.close()
+        pin_index.invalidate()
         
         return jsonify({
             'success': True,
             'message': 'Teacher deleted successfully!'
         })
-        
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def request_flag(name):
+    return request.values.get(name, '').lower() in ('1', 'true', 'yes')
+
+@app.route('/api/rfid/teachers/import', methods=['POST'])
+def import_teachers():
+    """Upsert a CSV roster (name, pin[, role, status]) in one transaction"""
+    if 'admin_logged_in' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    try:
+        upload = request.files.get('file')
+        data = upload.read() if upload else request.get_data()
+        rows = read_roster(data.decode('utf-8-sig'))
+
+        conn = get_db_connection()
+        try:
+            result = import_roster(
+                conn,
+                rows,
+                match=request.values.get('match', 'name'),
+                dry_run=request_flag('dry_run'),
+                strict=request_flag('strict')
+            )
+        finally:
+            conn.close()
+        if result['committed']:
+            pin_index.invalidate()
+
+        result['success'] = result['committed'] or result['dry_run']
+        return jsonify(result), 200 if result['success'] else 400
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
+        print(f"Error importing teachers: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/rfid/teachers/export')
+def export_teachers():
+    """Stream the teacher roster as CSV"""
+    if 'admin_logged_in' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    conn = get_db_connection()
+    cursor = conn.execute(f"SELECT {', '.join(EXPORT_COLUMNS)} FROM teacher_keys ORDER BY name, id")
+    return stream_csv(conn, cursor, 'teachers.csv')
+
 
 @app.route('/admin/delete/<int:report_id>', methods=['POST'])
 def delete_report(report_id):
@@ -795,39 +1383,32 @@ def delete_report(report_id):
         return jsonify({'error': 'Unauthorized'}), 401
     
     try:
-        # Get report info for file cleanup
         conn = get_db_connection()
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM hazard_reports WHERE id = ?", (report_id,))
-        report = cursor.fetchone()
-        conn.close()
-        
-        if not report:
-            return jsonify({'error': 'Report not found'}), 404
-        
-        # Delete associated files
-        if report['before_image']:
-            before_path = os.path.join(app.config['UPLOAD_FOLDER_BEFORE'], report['before_image'])
-            if os.path.exists(before_path):
-                os.remove(before_path)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM hazard_reports WHERE id = ?", (report_id,))
+            report = cursor.fetchone()
+            if not report:
+                return jsonify({'error': 'Report not found'}), 404
+            
+            cursor.execute("SELECT before_image FROM report_attachments WHERE report_id = ?", (report_id,))
+            refs = [('before', row['before_image']) for row in cursor.fetchall()]
+            refs.append(('before', report['before_image']))
+            refs.append(('after', report['after_image']))
+            
+            # Delete from database; triggers drop the image reference counts
+            cursor.execute("DELETE FROM report_attachments WHERE report_id = ?", (report_id,))
+            cursor.execute("DELETE FROM hazard_reports WHERE id = ?", (report_id,))
+            orphans = collect_orphans(cursor, refs)
+            conn.commit()
+        finally:
+            conn.close()
         
-        if report['after_image']:
-            after_path = os.path.join(app.config['UPLOAD_FOLDER_AFTER'], report['after_image'])
-            if os.path.exists(after_path):
-                os.remove(after_path)
+        # Only unlink images no other report still points at
+        remove_orphaned_images(orphans)
         
         if report['map_screenshot']:
-            map_path = os.path.join(app.config['UPLOAD_FOLDER_MAP_SCREENSHOTS'], report['map_screenshot'])
-            if os.path.exists(map_path):
-                os.remove(map_path)
-        
-        # Delete from database
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM hazard_reports WHERE id = ?", (report_id,))
-        conn.commit()
-        conn.close()
+            remove_map_screenshots([report['map_screenshot']])
         
         return jsonify({
             'success': True,
@@ -837,27 +1418,197 @@ def delete_report(report_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def bulk_response(results, done):
+    """Per-report results of a bulk call; partial failures are listed, not raised"""
+    failed = [result for result in results if result['result'] == 'not_found']
+    return jsonify({
+        'success': not failed,
+        done: sum(1 for result in results if result['result'] == done),
+        'failed': len(failed),
+        'results': results
+    })
+
+@app.route('/admin/bulk-resolve', methods=['POST'])
+def bulk_resolve_reports():
+    """Resolve several reports in one transaction, optionally with a shared after photo"""
+    if 'admin_logged_in' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    try:
+        if request.mimetype == 'multipart/form-data':
+            data, after_image = read_upload_request('after_image')
+        else:
+            data, after_image = request.get_json(silent=True) or {}, None
+        ids = parse_report_ids(data.get('ids'), app.config['BULK_MAX_REPORTS'])
+
+        # A photo no report ends up using is removed when the request ends
+        after_filename = None
+        if after_image:
+            after_filename = store_image(after_image, 'after')
+
+        conn = get_db_connection()
+        try:
+            results, updated, orphans = bulk_resolve(
+                conn,
+                ids,
+                datetime.now(),
+                after_filename,
+                'queued' if image_jobs.available() else 'skipped'
+            )
+        finally:
+            conn.close()
+        remove_orphaned_images(orphans)
+
+        if after_filename and updated and image_jobs.available():
+            queue_image_processing(updated, 'after', 'after_image', after_filename)
+
+        return bulk_response(results, 'resolved')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error in bulk resolve: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/admin/bulk-delete', methods=['POST'])
+def bulk_delete_reports():
+    """Delete several reports in one transaction; files are removed in the background"""
+    if 'admin_logged_in' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    try:
+        data = request.get_json(silent=True) or request.form
+        ids = parse_report_ids(data.get('ids'), app.config['BULK_MAX_REPORTS'])
+
+        conn = get_db_connection()
+        try:
+            results, orphans, map_screenshots = bulk_delete(conn, ids)
+        finally:
+            conn.close()
+        remove_orphaned_images(orphans)
+        remove_map_screenshots(map_screenshots)
+
+        return bulk_response(results, 'deleted')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error in bulk delete: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/reports', methods=['GET'])
 def get_reports():
+    """List reports newest first, one keyset page at a time.
+    
+    Supports ?status=, ?role=, ?reporter=, ?from=, ?to=, ?limit= and the
+    ?cursor= token returned as next_cursor by the previous page.
+    ?bbox=min_lon,min_lat,max_lon,max_lat and ?near=lat,lon&radius=metres
+    restrict results through the spatial index. With
+    ?format=ndjson (or Accept: application/x-ndjson) or ?stream=1 every
+    matching row is streamed straight from the cursor instead.
+    """
     try:
-        conn = get_db_connection()
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM hazard_reports ORDER BY date_reported DESC")
-        reports = cursor.fetchall()
-        conn.close()
+        stream_format = requested_stream_format(request)
+        etag = listing_etag('hazard_reports', 'api', stream_format, request.query_string.decode('utf-8'))
+        cached = not_modified(etag)
+        if cached:
+            return vary_on_accept(cached)
         
-        # Convert to list of dicts for JSON serialization
-        reports_list = []
-        for report in reports:
-            report_dict = dict(report)
-            reports_list.append(report_dict)
+        if stream_format:
+            limit = parse_limit(request.args, None, None)
+            sql, params = build_report_query(request.args, limit)
+            conn = get_db_connection()
+            try:
+                cursor = conn.execute(sql, params)
+            except Exception:
+                conn.close()
+                raise
+            return vary_on_accept(with_etag(stream_rows(conn, cursor, stream_format, 'reports'), etag))
         
-        return jsonify({
+        limit = parse_limit(request.args, app.config['REPORTS_PAGE_SIZE'], app.config['REPORTS_MAX_PAGE_SIZE'])
+        
+        reports_list, next_cursor = report_page(request.args, limit)
+        
+        return vary_on_accept(with_etag(jsonify({
             'success': True,
-            'reports': reports_list
-        })
+            'reports': reports_list,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        }), etag))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/reports/clusters')
+def get_report_clusters():
+    """Report markers grouped into grid cells for the map at ?zoom=, within ?bbox=.
+
+    Each cluster has its mean position, a count and a count per status;
+    single reports also carry their id.
+    """
+    try:
+        zoom = parse_zoom(request.args.get('zoom'), app.config['CLUSTER_MAX_ZOOM'])
+        if not request.args.get('bbox'):
+            raise ValueError('bbox is required')
+        bbox = parse_bbox(request.args['bbox'])
+
+        etag = listing_etag('hazard_reports', 'clusters', zoom, bbox)
+        cached = not_modified(etag)
+        if cached:
+            return cached
+
+        conn = get_db_connection()
+        try:
+            clusters = cluster_index.clusters(conn, zoom, bbox)
+        finally:
+            conn.close()
+
+        return with_etag(jsonify({
+            'success': True,
+            'zoom': zoom,
+            'total': sum(cluster['count'] for cluster in clusters),
+            'clusters': clusters
+        }), etag)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/reports/export')
+def export_reports():
+    """Stream reports as CSV, GeoJSON or NDJSON (?format=), optionally gzipped (?gzip=1).
+
+    Takes the same filters as /api/reports and reads straight from the
+    cursor, so large exports use constant memory.
+    """
+    if 'admin_logged_in' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    try:
+        fmt = parse_export_format(request.args.get('format'))
+        compress = request_flag('gzip')
+        sql, params = build_report_query(request.args, parse_limit(request.args, None, None),
+                                         ', '.join(REPORT_EXPORT_COLUMNS))
+        conn = get_db_connection()
+        try:
+            cursor = conn.execute(sql, params)
+        except Exception:
+            conn.close()
+            raise
+
+        def generate():
+            try:
+                yield from export_chunks(cursor, fmt, compress)
+            finally:
+                conn.close()
+
+        mimetype = 'application/gzip' if compress else EXPORT_FORMATS[fmt][0]
+        response = app.response_class(generate(), mimetype=mimetype)
+        response.headers['Content-Disposition'] = f'attachment; filename="{export_filename(fmt, compress)}"'
+        return response
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
+        print(f"Error exporting reports: {e}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/report', methods=['POST'])
@@ -867,14 +1618,47 @@ def report_hazard():
         return jsonify({'error': 'Authentication required'}), 401
     
     try:
-        data = request.json
+        data, before_image = read_upload_request('before_image')
         
         # Validate required fields
-        required_fields = ['before_image', 'description', 'latitude', 'longitude']
+        if before_image is None or before_image == '':
+            return jsonify({'error': 'Missing required field: before_image'}), 400
+        required_fields = ['description', 'latitude', 'longitude']
         for field in required_fields:
             if field not in data or not data[field]:
                 return jsonify({'error': f'Missing required field: {field}'}), 400
         
+        try:
+            latitude = float(data['latitude'])
+            longitude = float(data['longitude'])
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Invalid coordinates'}), 400
+        
+        # Look for open reports of the same hazard (nearby and recent)
+        duplicate_mode = data.get('duplicate_mode', 'report')
+        attach_to = data.get('attach_to')
+        conn = get_db_connection()
+        try:
+            duplicates = [dict(row) for row in find_nearby_pending(
+                conn,
+                latitude,
+                longitude,
+                app.config['DUPLICATE_RADIUS_M'],
+                datetime.now() - timedelta(minutes=app.config['DUPLICATE_WINDOW_MINUTES']),
+                app.config['DUPLICATE_MAX_CANDIDATES']
+            )]
+            if attach_to:
+                target = conn.execute(
+                    "SELECT id FROM hazard_reports WHERE id = ? AND status = 'Pending'", (attach_to,)
+                ).fetchone()
+                if not target:
+                    return jsonify({'error': 'Report to attach to not found or already resolved'}), 404
+                attach_to = target['id']
+            elif duplicate_mode == 'attach' and duplicates:
+                attach_to = duplicates[0]['id']
+        finally:
+            conn.close()
+        
         # Handle optional map screenshot
         map_screenshot_url = data.get('map_screenshot_url')
         map_screenshot_filename = None
@@ -887,50 +1671,85 @@ def report_hazard():
                 map_screenshot_filename = map_screenshot_url.split('/')[-1]
         
         # Save before image
-        before_image_data = data['before_image']
-        before_filename = None
+        try:
+            before_filename = store_image(before_image, 'before')
+        except UploadError as e:
+            return jsonify({'error': str(e)}), 400
         
-        if before_image_data.startswith('data:image'):
-            # Extract base64 data
-            header, base64_data = before_image_data.split(',', 1)
-            file_extension = header.split(';')[0].split('/')[1]
-            before_filename = f"hazard_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{file_extension}"
-            filepath = os.path.join(app.config['UPLOAD_FOLDER_BEFORE'], before_filename)
+        if attach_to:
+            # Merge this submission into the existing report instead of creating a new one
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO report_attachments
+                (report_id, before_image, description, latitude, longitude, date_attached, user_id, user_name, user_role, rfid_code, processing_state)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                attach_to,
+                before_filename,
+                data['description'],
+                latitude,
+                longitude,
+                datetime.now(),
+                session.get('user_id'),
+                session.get('user_name'),
+                session.get('user_role'),
+                session.get('rfid_card'),
+                'queued' if image_jobs.available() else 'skipped'
+            ))
+            attachment_id = cursor.lastrowid
+            conn.commit()
+            conn.close()
             
-            # Ensure directory exists
-            os.makedirs(app.config['UPLOAD_FOLDER_BEFORE'], exist_ok=True)
+            # Attached photos get the same EXIF stripping as new reports
+            if image_jobs.available():
+                queue_image_processing([attachment_id], 'before', 'before_image', before_filename, 'report_attachments')
             
-            # Save file
-            import base64
-            with open(filepath, 'wb') as f:
-                f.write(base64.b64decode(base64_data))
-        else:
-            return jsonify({'error': 'Invalid image format'}), 400
+            log_user_activity(
+                session.get('user_id', 0),
+                session.get('user_name', 'Unknown'),
+                session.get('user_role', 'Unknown'),
+                f'ATTACH_REPORT:{attach_to}',
+                request.remote_addr
+            )
+            
+            return jsonify({
+                'success': True,
+                'report_id': attach_to,
+                'attached': True,
+                'attachment_id': attachment_id,
+                'message': f'Report added to existing report #{attach_to}'
+            })
         
         # Insert into database with user information
         conn = get_db_connection()
         cursor = conn.cursor()
         cursor.execute('''
             INSERT INTO hazard_reports 
-            (before_image, description, latitude, longitude, status, date_reported, map_screenshot, user_id, user_name, user_role, rfid_code)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            (before_image, description, latitude, longitude, status, date_reported, map_screenshot, user_id, user_name, user_role, rfid_code, processing_state)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''', (
             before_filename,
             data['description'],
-            data['latitude'],
-            data['longitude'],
+            latitude,
+            longitude,
             'Pending',
             datetime.now(),
             map_screenshot_filename,
             session.get('user_id'),
             session.get('user_name'),
             session.get('user_role'),
-            session.get('rfid_card')
+            session.get('rfid_card'),
+            'queued' if image_jobs.available() else 'skipped'
         ))
         report_id = cursor.lastrowid
         conn.commit()
         conn.close()
         
+        # EXIF stripping, recompression and thumbnails happen off the request thread
+        if image_jobs.available():
+            queue_image_processing([report_id], 'before', 'before_image', before_filename)
+        
         # Log report submission
         log_user_activity(
             session.get('user_id', 0),
@@ -943,6 +1762,7 @@ def report_hazard():
         return jsonify({
             'success': True,
             'report_id': report_id,
+            'duplicates': duplicates,
             'message': 'Report submitted successfully!'
         })
         
@@ -952,106 +1772,176 @@ def report_hazard():
 @app.route('/api/rfid/verify-pin', methods=['POST'])
 def verify_rfid_pin():
     """Verify PIN/RFID for React app"""
-    print(f"DEBUG: verify_rfid_pin called with data: {request.json}")  # Debug print
     try:
-        data = request.json
-        pin = data.get('pin')
-        rfid = data.get('rfid')  # Also accept RFID data
-        
-        print(f"DEBUG: Received PIN: {pin}, RFID: {rfid}")  # Debug print
-        
-        if not pin and not rfid:
-            print("DEBUG: No PIN or RFID provided")
+        credentials = credentials_from(request.get_json(silent=True))
+        if not credentials['pin'] and not credentials['rfid']:
             return jsonify({'valid': False, 'message': 'PIN or RFID is required'}), 400
         
-        # Get client IP for logging
-        client_ip = request.remote_addr
-        user_info = None
-        auth_method = None
-        
-        # Check for PIN authentication (teachers)
-        if pin:
-            print(f"DEBUG: Checking PIN {pin} in database")  # Debug print
-            conn = get_db_connection()
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM teacher_keys WHERE pin = ? AND status = 'active'", (pin,))
-            teacher = cursor.fetchone()
-            conn.close()
-            
-            print(f"DEBUG: Database query result: {teacher}")  # Debug print
-            
-            if teacher:
-                user_info = teacher
-                auth_method = 'PIN'
-                print(f"DEBUG: PIN authentication successful for {teacher['name']}")
-        
-        # Check for RFID authentication (any RFID card)
-        elif rfid:
-            # Accept any RFID format (XX:XX:XX:XX)
-            if ':' in rfid and len(rfid.split(':')) == 4:
-                user_info = {
-                    'id': 0,  # Special ID for RFID users
-                    'name': f'RFID User ({rfid})',
-                    'role': 'RFID User',
-                    'pin': rfid
-                }
-                auth_method = 'RFID'
-                print(f"DEBUG: RFID authentication successful for {rfid}")
+        retry_after = admit_login(auth_engine, credentials)
+        if retry_after is not None:
+            return too_many_attempts({'valid': False, 'message': 'Too many attempts, try again later'}, retry_after)
         
-        if user_info:
-            print(f"DEBUG: Setting user session for {user_info['name']}")
-            # Set user session
-            session['user_logged_in'] = True
-            session['user_id'] = user_info['id']
-            session['user_name'] = user_info['name']
-            session['user_role'] = user_info['role']
-            if auth_method == 'RFID':
-                session['rfid_card'] = user_info['pin']
-            
-            # Log successful authentication
-            log_user_activity(
-                user_info['id'], 
-                user_info['name'], 
-                user_info['role'], 
-                f'LOGIN_SUCCESS_{auth_method}',
-                client_ip
-            )
-            
-            response_data = {
+        result = login_with(auth_engine, credentials)
+        if result.success:
+            return jsonify({
                 'valid': True,
-                'teacher': {
-                    'id': user_info['id'],
-                    'name': user_info['name'],
-                    'role': user_info['role']
-                },
+                'teacher': teacher_payload(result),
                 'redirect': url_for('index')
-            }
-            print(f"DEBUG: Returning success response: {response_data}")
-            return jsonify(response_data)
-        else:
-            print(f"DEBUG: Authentication failed for PIN: {pin}")
-            # Log failed authentication attempt
-            auth_data = rfid if rfid else f'PIN:{pin}'
-            log_user_activity(
-                0, 
-                'Unknown', 
-                'Unknown', 
-                f'LOGIN_FAILED_{auth_method}:{auth_data}',
-                client_ip
-            )
-            
-            response_data = {
-                'valid': False,
-                'message': 'Invalid authentication'
-            }
-            print(f"DEBUG: Returning failure response: {response_data}")
-            return jsonify(response_data)
-            
+            })
+        return jsonify({
+            'valid': False,
+            'message': 'Invalid authentication'
+        })
     except Exception as e:
-        print(f"Error in verify_rfid_pin: {str(e)}")  # Debug print
+        print(f"Error in verify_rfid_pin: {str(e)}")
         return jsonify({'valid': False, 'message': f'Server error: {str(e)}'})
 
+@app.cli.command('precompress-assets')
+def precompress_assets_command():
+    """Write gzip/brotli siblings for the RFID SPA assets ahead of time"""
+    count = rfid_shell.precompress_assets()
+    print(f'Checked {count} assets in {rfid_shell.assets_dir}.')
+
+@app.cli.command('reprocess-images')
+def reprocess_images_command():
+    """Re-run image processing for reports and attachments left queued or failed"""
+    if not image_jobs.available():
+        print('Pillow is not installed; nothing to do.')
+        return
+    
+    conn = get_db_connection()
+    reports = conn.execute('''
+        SELECT id, before_image, after_image FROM hazard_reports
+        WHERE processing_state IN ('queued', 'failed')
+    ''').fetchall()
+    # Attachments stored before they were processed have no state at all
+    attachments = conn.execute('''
+        SELECT id, before_image FROM report_attachments
+        WHERE processing_state IS NULL OR processing_state IN ('queued', 'failed')
+    ''').fetchall()
+    conn.close()
+    
+    futures = []
+    for report in reports:
+        for folder, column in (('before', 'before_image'), ('after', 'after_image')):
+            if report[column]:
+                futures.append(queue_image_processing([report['id']], folder, column, report[column]))
+    for attachment in attachments:
+        if attachment['before_image']:
+            futures.append(queue_image_processing(
+                [attachment['id']], 'before', 'before_image', attachment['before_image'], 'report_attachments'
+            ))
+    for future in futures:
+        future.exception()
+    image_jobs.shutdown()
+    print(f'Reprocessed {len(futures)} images from {len(reports)} reports and {len(attachments)} attachments.')
+
+@app.cli.command('rebuild-stats')
+def rebuild_stats_command():
+    """Recompute the dashboard summary tables from hazard_reports"""
+    conn = sqlite3.connect(app.config['DATABASE'])
+    try:
+        rebuild_report_stats(conn.cursor())
+        conn.commit()
+        print(f"Rebuilt statistics for {status_counts(conn)['total']} reports.")
+    finally:
+        conn.close()
+
+@app.cli.command('rebuild-search')
+def rebuild_search_command():
+    """Rebuild the full-text search indexes from the source tables"""
+    conn = sqlite3.connect(app.config['DATABASE'])
+    try:
+        rebuild_search_index(conn.cursor())
+        conn.commit()
+        print('Rebuilt search indexes for ' + ', '.join(SEARCH_SOURCES) + '.')
+    finally:
+        conn.close()
+
+@app.cli.command('prune-activity')
+@click.option('--days', type=int, default=None, help='Keep this many days of raw activity.')
+@click.option('--no-archive', is_flag=True, help='Delete old rows without writing an archive.')
+def prune_activity_command(days, no_archive):
+    """Roll up, archive and delete old user_activity rows"""
+    days = days if days is not None else app.config['ACTIVITY_RETENTION_DAYS']
+    cutoff = retention_cutoff(days)
+    conn = sqlite3.connect(app.config['DATABASE'], timeout=app.config['DB_BUSY_TIMEOUT_MS'] / 1000.0)
+    conn.row_factory = sqlite3.Row
+    try:
+        pruned, archive_path = prune_activity(
+            conn,
+            cutoff,
+            archive_folder=None if no_archive else app.config['ACTIVITY_ARCHIVE_FOLDER'],
+            batch_size=app.config['ACTIVITY_PRUNE_BATCH_SIZE'],
+            pause=app.config['ACTIVITY_PRUNE_PAUSE']
+        )
+    finally:
+        conn.close()
+    print(f'Pruned {pruned} activity rows older than {cutoff} UTC.')
+    if archive_path:
+        print(f'Archived to {archive_path}')
+
+@app.cli.command('import-teachers')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--match', type=click.Choice(MATCH_KEYS), default='name', help='Column that identifies an existing teacher.')
+@click.option('--dry-run', is_flag=True, help='Validate and report without writing.')
+@click.option('--strict', is_flag=True, help='Write nothing if any row is invalid.')
+def import_teachers_command(path, match, dry_run, strict):
+    """Upsert teacher keys from a CSV roster in one transaction"""
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        rows = read_roster(f.read())
+    conn = sqlite3.connect(app.config['DATABASE'], timeout=app.config['DB_BUSY_TIMEOUT_MS'] / 1000.0)
+    try:
+        result = import_roster(conn, rows, match=match, dry_run=dry_run, strict=strict)
+    finally:
+        conn.close()
+    for entry in result['rows']:
+        if entry['action'] == 'error':
+            print(f"Line {entry['line']} ({entry['name'] or 'no name'}): {'; '.join(entry['errors'])}")
+    print(f"{result['created']} created, {result['updated']} updated, "
+          f"{result['unchanged']} unchanged, {result['errors']} invalid.")
+    if not result['committed']:
+        print('Nothing was written.')
+
+@app.cli.command('export-teachers')
+@click.option('--output', type=click.File('w', encoding='utf-8'), default='-', help='File to write (default: stdout).')
+def export_teachers_command(output):
+    """Write the teacher roster as CSV"""
+    conn = sqlite3.connect(app.config['DATABASE'])
+    try:
+        writer = csv.writer(output)
+        writer.writerow(EXPORT_COLUMNS)
+        writer.writerows(conn.execute(f"SELECT {', '.join(EXPORT_COLUMNS)} FROM teacher_keys ORDER BY name, id"))
+    finally:
+        conn.close()
+
+@app.cli.command('export-reports')
+@click.option('--format', 'fmt', type=click.Choice(list(EXPORT_FORMATS)), default='csv', help='Output format.')
+@click.option('--gzip', 'compress', is_flag=True, help='Gzip-compress the output.')
+@click.option('--output', type=click.File('wb'), default='-', help='File to write (default: stdout).')
+@click.option('--status', help='Only reports with this status.')
+@click.option('--role', help='Only reports filed by this role.')
+@click.option('--reporter', help='Only reports filed by this user name.')
+@click.option('--from', 'date_from', help='Reported on or after this date.')
+@click.option('--to', 'date_to', help='Reported on or before this date.')
+@click.option('--bbox', help='min_lon,min_lat,max_lon,max_lat')
+@click.option('--near', help='lat,lon; only reports within --radius metres of it.')
+@click.option('--radius', help='Radius in metres for --near.')
+def export_reports_command(fmt, compress, output, date_from, date_to, **filters):
+    """Stream hazard reports as CSV, GeoJSON or NDJSON"""
+    # Same argument names as /api/reports/export, through the same query builder
+    args = dict(filters, **{'from': date_from, 'to': date_to})
+    try:
+        sql, params = build_report_query({k: v for k, v in args.items() if v}, None, ', '.join(REPORT_EXPORT_COLUMNS))
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    conn = get_db_connection()
+    try:
+        for chunk in export_chunks(conn.execute(sql, params), fmt, compress):
+            output.write(chunk if compress else chunk.encode('utf-8'))
+    finally:
+        conn.close()
+
 if __name__ == '__main__':
     init_db()
     app.run(debug=True, host='0.0.0.0', port=5001)
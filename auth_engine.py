@@ -0,0 +1,113 @@
+class AuthResult:
+    """Outcome of one authentication attempt"""
+
+    __slots__ = ('success', 'user', 'method', 'credential')
+
+    def __init__(self, success, user=None, method=None, credential=None):
+        self.success = success
+        self.user = user
+        self.method = method
+        self.credential = credential
+
+    @property
+    def audit_action(self):
+        """user_activity action recorded for this attempt"""
+        if self.success:
+            return f'LOGIN_SUCCESS_{self.method}'
+        return f'LOGIN_FAILED_{self.method}:{self.credential}'
+
+
+class PinBackend:
+    """Teacher PINs, answered from the in-memory PinIndex"""
+
+    method = 'PIN'
+    field = 'pin'
+
+    def __init__(self, pin_index):
+        self.pin_index = pin_index
+
+    def authenticate(self, pin):
+        teacher = self.pin_index.lookup(pin)
+        if teacher is None:
+            return None
+        return {'id': teacher['id'], 'name': teacher['name'], 'role': teacher['role']}
+
+    def describe(self, pin):
+        return f'PIN:{pin}'
+
+
+class RfidBackend:
+    """RFID cards: any card UID of the form XX:XX:XX:XX is accepted"""
+
+    method = 'RFID'
+    field = 'rfid'
+
+    def __init__(self, label='RFID User', role='RFID User'):
+        self.label = label
+        self.role = role
+
+    def authenticate(self, card):
+        parts = str(card).split(':')
+        if len(parts) != 4:
+            return None
+        # Special ID 0 for RFID users; the card itself identifies them
+        return {'id': 0, 'name': f'{self.label} ({card})', 'role': self.role, 'rfid_card': card}
+
+    def describe(self, card):
+        return card
+
+
+class AuthEngine:
+    """Single authentication path shared by every PIN/RFID endpoint.
+
+    Backends are tried in order and the first one whose credential field is
+    present decides the attempt. Every attempt, successful or not, is passed
+    to the ``audit`` hook exactly once.
+    """
+
+    def __init__(self, backends, audit=None):
+        self.backends = list(backends)
+        self.audit = audit
+
+    def authenticate(self, credentials, client_ip=None):
+        result = AuthResult(False, method='NONE', credential='')
+        for backend in self.backends:
+            value = credentials.get(backend.field)
+            if not value:
+                continue
+            user = backend.authenticate(value)
+            if user is not None:
+                result = AuthResult(True, user, backend.method)
+            else:
+                result = AuthResult(False, method=backend.method, credential=backend.describe(value))
+            break
+
+        if self.audit is not None:
+            self.audit(result, client_ip)
+        return result
+
+    def credential_key(self, credentials):
+        """Identifier of the credential the attempt will be decided by, or None"""
+        for backend in self.backends:
+            value = credentials.get(backend.field)
+            if value:
+                return backend.describe(value)
+        return None
+
+
+def _field(data, *names):
+    # JSON clients may send PINs as numbers; teacher_keys stores them as text
+    for name in names:
+        value = data.get(name)
+        if value is not None and str(value).strip():
+            return str(value).strip()
+    return None
+
+
+def credentials_from(data):
+    """Normalise the field names the different login clients send"""
+    data = data or {}
+    return {
+        'pin': _field(data, 'pin', 'teacher_pin'),
+        'rfid': _field(data, 'rfid', 'card_id'),
+    }
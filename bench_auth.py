@@ -0,0 +1,75 @@
+"""Micro-benchmark for the shared PIN/RFID authentication engine.
+
+Builds a throwaway database with a teacher_keys table, then times
+AuthEngine.authenticate for a PIN hit, a PIN miss and an RFID card, with the
+audit hook stubbed out so only the authentication path is measured.
+
+    python bench_auth.py [--teachers N] [--iterations N]
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from auth_engine import AuthEngine, PinBackend, RfidBackend
+from db import create_data_version_triggers
+from pin_index import PinIndex
+
+
+def build_database(path, teachers):
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE TABLE teacher_keys (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            pin TEXT NOT NULL,
+            role TEXT DEFAULT 'Teacher',
+            status TEXT DEFAULT 'active'
+        )
+    ''')
+    cursor.executemany(
+        'INSERT INTO teacher_keys (name, pin) VALUES (?, ?)',
+        [(f'Teacher {i}', f'{i:06d}') for i in range(teachers)]
+    )
+    create_data_version_triggers(cursor, 'teacher_keys')
+    conn.commit()
+    conn.close()
+
+
+def time_case(engine, credentials, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        engine.authenticate(credentials, '127.0.0.1')
+    return iterations / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--teachers', type=int, default=500)
+    parser.add_argument('--iterations', type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        build_database(path, args.teachers)
+
+        pin_index = PinIndex(lambda: sqlite3.connect(path, check_same_thread=False))
+        engine = AuthEngine([PinBackend(pin_index), RfidBackend()], audit=lambda result, client_ip: None)
+
+        cases = [
+            ('PIN hit', {'pin': f'{args.teachers // 2:06d}', 'rfid': None}),
+            ('PIN miss', {'pin': 'nope', 'rfid': None}),
+            ('RFID', {'pin': None, 'rfid': 'AB:CD:EF:01'}),
+        ]
+        # Warm the index so the first case doesn't pay for the initial load
+        engine.authenticate(cases[0][1])
+
+        for name, credentials in cases:
+            rate = time_case(engine, credentials, args.iterations)
+            print(f'{name:<10} {rate:>12,.0f} auths/s  ({1e6 / rate:.2f} us each)')
+
+
+if __name__ == '__main__':
+    main()
@@ -4,17 +4,119 @@ class Config:
     # Secret key for session management
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     
+    # gunicorn processes and request threads per process; gunicorn.conf.py
+    # reads these, so command-line -w/--threads should match them
+    WEB_WORKERS = int(os.environ.get('WEB_WORKERS', 4))
+    WEB_THREADS = int(os.environ.get('WEB_THREADS', 8))
+    
     # Database configuration
     DATABASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'hazard.db')
     
+    # Connection pool settings (PRAGMAs are applied once per pooled connection)
+    DB_POOL_MAX_IDLE = 4
+    DB_STATEMENT_CACHE_SIZE = 256
+    DB_BUSY_TIMEOUT_MS = 10000
+    DB_PRAGMAS = [
+        'journal_mode=WAL',
+        'synchronous=NORMAL',
+        'cache_size=-16000',
+        'mmap_size=67108864',
+        'temp_store=MEMORY',
+        f'busy_timeout={DB_BUSY_TIMEOUT_MS}',
+    ]
+    
     # Upload configuration
     UPLOAD_FOLDER_BEFORE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads', 'before')
     UPLOAD_FOLDER_AFTER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads', 'after')
+    THUMBNAIL_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads', 'thumbs')
     UPLOAD_FOLDER_MAP_SCREENSHOTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'map_screenshots')
     
     # Maximum upload size (16MB)
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024
     
+    # Background user_activity writer (set ACTIVITY_LOG_ASYNC = False to write inline)
+    ACTIVITY_LOG_ASYNC = True
+    ACTIVITY_LOG_MAX_QUEUE = 10000
+    ACTIVITY_LOG_BATCH_SIZE = 200
+    ACTIVITY_LOG_FLUSH_INTERVAL = 0.5
+    
+    # user_activity retention (flask prune-activity): raw rows older than
+    # ACTIVITY_RETENTION_DAYS are rolled up hourly, archived and deleted
+    ACTIVITY_RETENTION_DAYS = 90
+    ACTIVITY_ARCHIVE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'archives', 'user_activity')
+    ACTIVITY_PRUNE_BATCH_SIZE = 500
+    ACTIVITY_PRUNE_PAUSE = 0.05
+    
+    # Report listing page sizes (keyset pagination)
+    REPORTS_PAGE_SIZE = 50
+    REPORTS_MAX_PAGE_SIZE = 500
+    
+    # Full-text search result pages
+    SEARCH_PAGE_SIZE = 20
+    SEARCH_MAX_PAGE_SIZE = 100
+    
+    # /api/user-activity page sizes (keyset pagination)
+    ACTIVITY_PAGE_SIZE = 100
+    ACTIVITY_MAX_PAGE_SIZE = 1000
+    
+    # Most report ids accepted by /admin/bulk-resolve and /admin/bulk-delete
+    BULK_MAX_REPORTS = 500
+    
+    # Near-duplicate detection for new reports
+    DUPLICATE_RADIUS_M = 30
+    DUPLICATE_WINDOW_MINUTES = 60
+    DUPLICATE_MAX_CANDIDATES = 5
+    
+    # Map clustering (/api/reports/clusters): GRID x GRID cells per tile, at
+    # most MAX_TILES tiles per request, CACHE_SIZE tiles kept per worker
+    CLUSTER_GRID = 4
+    CLUSTER_MAX_ZOOM = 22
+    CLUSTER_MAX_TILES = 64
+    CLUSTER_CACHE_SIZE = 4096
+    
+    # Report image derivatives (thumbnails served by /thumbs/...)
+    THUMBNAIL_WIDTHS = [320, 640]
+    THUMBNAIL_LIST_WIDTH = 640
+    THUMBNAIL_QUALITY = 80
+    THUMBNAIL_MAX_AGE = 365 * 24 * 60 * 60
+    
+    # Background image processing ('process' or 'thread' pool). IMAGE_JOB_WORKERS
+    # is per web worker: every gunicorn worker starts its own pool, so the
+    # default shares the cores between them and stays at 1-2 processes each
+    IMAGE_JOB_EXECUTOR = 'process'
+    IMAGE_JOB_WORKERS = min(2, max(1, (os.cpu_count() or 1) // WEB_WORKERS))
+    # How the process pool starts its workers; None picks 'forkserver' where
+    # available, else 'spawn' (never 'fork', which copies the app's threads and locks)
+    IMAGE_JOB_START_METHOD = None
+    IMAGE_MAX_DIMENSION = 2048
+    IMAGE_QUALITY = 82
+    
+    # Hashed RFID SPA assets never change, so browsers may cache them for a year
+    RFID_ASSET_MAX_AGE = 365 * 24 * 60 * 60
+    
+    # Login throttling: token buckets per client IP and per credential (PIN or
+    # card), ``burst`` attempts at once refilled at ``rate`` per second. Use the
+    # 'sqlite' store to share buckets between gunicorn workers.
+    AUTH_RATE_LIMIT_ENABLED = True
+    AUTH_IP_BURST = 20
+    AUTH_IP_RATE = 0.5
+    AUTH_CREDENTIAL_BURST = 5
+    AUTH_CREDENTIAL_RATE = 5 / 60
+    AUTH_RATE_LIMIT_STORE = 'memory'
+    AUTH_RATE_LIMIT_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rate_limits.db')
+    AUTH_THROTTLE_SUMMARY_INTERVAL = 60
+    
+    # Server-Sent Events feed (/api/events). Each stream is closed after
+    # EVENTS_STREAM_MAX_SECONDS and the browser reconnects with Last-Event-ID,
+    # so long-lived streams never pin a sync worker for good. A stream holds
+    # one request thread, so each worker accepts at most half its threads as
+    # streams and keeps the rest for logins and reports.
+    EVENTS_POLL_INTERVAL = 0.5
+    EVENTS_HEARTBEAT_SECONDS = 15
+    EVENTS_STREAM_MAX_SECONDS = 300
+    EVENTS_MAX_SUBSCRIBERS = max(1, WEB_THREADS // 2)
+    EVENTS_RETENTION = 10000
+    
     # Allowed file extensions
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
     
@@ -0,0 +1,161 @@
+import os
+import sqlite3
+import threading
+
+
+class PooledConnection(sqlite3.Connection):
+    """SQLite connection whose close() hands it back to its pool"""
+
+    _pool = None
+    _in_use = False
+
+    def close(self):
+        if self._pool is None:
+            super().close()
+        elif self._in_use:
+            self._pool.release(self)
+
+    def really_close(self):
+        self._pool = None
+        super().close()
+
+
+class ConnectionPool:
+    """Per-thread pool of pre-configured SQLite connections.
+
+    Connections are opened once per thread, get their PRAGMAs applied a single
+    time and keep their prepared-statement cache across requests. Code that
+    calls ``conn.close()`` simply returns the connection to the idle list.
+    """
+
+    def __init__(self, pragmas=None, max_idle=4, statement_cache_size=256,
+                 timeout=10.0, on_connect=None):
+        self.pragmas = list(pragmas or [])
+        self.max_idle = max_idle
+        self.statement_cache_size = statement_cache_size
+        self.timeout = timeout
+        self.on_connect = on_connect
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        # Called at start-up and again after a fork: connections opened by the
+        # parent process must never be reused by a gunicorn worker.
+        self._pid = os.getpid()
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        self.discarded = 0
+        self.opened = 0
+
+    def _idle(self, database):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._reset()
+        idle = getattr(self._local, 'idle', None)
+        if idle is None:
+            idle = self._local.idle = {}
+        return idle.setdefault(database, [])
+
+    def _open(self, database):
+        conn = sqlite3.connect(
+            database,
+            timeout=self.timeout,
+            factory=PooledConnection,
+            cached_statements=self.statement_cache_size,
+        )
+        for pragma in self.pragmas:
+            conn.execute(f'PRAGMA {pragma}')
+        if self.on_connect:
+            self.on_connect(conn)
+        conn._pool = self
+        conn._database = database
+        with self._lock:
+            self.opened += 1
+        return conn
+
+    def connect(self, database):
+        """Return an idle connection for this thread or open a new one"""
+        idle = self._idle(database)
+        if idle:
+            conn = idle.pop()
+            with self._lock:
+                self.hits += 1
+        else:
+            conn = self._open(database)
+            with self._lock:
+                self.misses += 1
+        conn._in_use = True
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def release(self, conn):
+        """Roll back anything left open and put the connection back"""
+        conn._in_use = False
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.really_close()
+            with self._lock:
+                self.discarded += 1
+            return
+        conn.row_factory = sqlite3.Row
+        idle = self._idle(conn._database)
+        if len(idle) >= self.max_idle:
+            conn.really_close()
+            with self._lock:
+                self.discarded += 1
+            return
+        idle.append(conn)
+
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / requests, 4) if requests else None,
+                'opened': self.opened,
+                'discarded': self.discarded,
+                'max_idle_per_thread': self.max_idle,
+                'statement_cache_size': self.statement_cache_size,
+            }
+
+
+def create_data_version_triggers(cursor, table):
+    """Keep a version counter for ``table`` bumped by every write to it.
+
+    The counter lives in the data_versions table so every worker process sees
+    the same value; reading it is a primary-key lookup that never touches
+    ``table`` itself.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS data_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('INSERT OR IGNORE INTO data_versions (name, version) VALUES (?, 0)', (table,))
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_version_{event.lower()}
+            AFTER {event} ON {table}
+            BEGIN
+                UPDATE data_versions SET version = version + 1 WHERE name = '{table}';
+            END
+        ''')
+
+
+def get_data_version(conn, table):
+    """Current version counter for ``table`` (0 if it is not tracked)"""
+    row = conn.execute('SELECT version FROM data_versions WHERE name = ?', (table,)).fetchone()
+    return row[0] if row else 0
+
+
+def add_column_if_missing(cursor, table, column, definition):
+    """ALTER TABLE migration for databases created before ``column`` existed"""
+    columns = [row[1] for row in cursor.execute(f'PRAGMA table_info({table})')]
+    if column not in columns:
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
@@ -0,0 +1,228 @@
+import os
+import queue
+import threading
+import time
+
+# Activity pushed live: sign-ins, sign-outs and report submissions. Page views
+# (ACCESS_*) make up most of user_activity and are not worth a second write
+# each; the activity lists still show them when reloaded.
+LIVE_ACTIVITY_PREFIXES = ('LOGIN_', 'LOGOUT', 'SUBMIT_REPORT')
+
+LIVE_ACTIVITY_SQL = ' OR '.join(
+    f"substr(NEW.action, 1, {len(prefix)}) = '{prefix}'" for prefix in LIVE_ACTIVITY_PREFIXES
+)
+
+# The event types the admin dashboard and RFID management page listen for:
+# event type -> (table, trigger event, WHEN condition, payload expression)
+EVENT_TRIGGERS = {
+    'report_created': ('hazard_reports', 'INSERT', None, '''json_object(
+        'id', NEW.id, 'status', NEW.status, 'description', NEW.description,
+        'latitude', NEW.latitude, 'longitude', NEW.longitude,
+        'date_reported', NEW.date_reported, 'user_name', NEW.user_name, 'user_role', NEW.user_role
+    )'''),
+    'report_resolved': ('hazard_reports', 'UPDATE OF status',
+                        "NEW.status = 'Resolved' AND OLD.status IS NOT 'Resolved'", '''json_object(
+        'id', NEW.id, 'status', NEW.status, 'date_resolved', NEW.date_resolved
+    )'''),
+    'report_deleted': ('hazard_reports', 'DELETE', None, "json_object('id', OLD.id)"),
+    'activity': ('user_activity', 'INSERT', LIVE_ACTIVITY_SQL, '''json_object(
+        'id', NEW.id, 'user_id', NEW.user_id, 'user_name', NEW.user_name, 'user_role', NEW.user_role,
+        'action', NEW.action, 'ip_address', NEW.ip_address, 'timestamp', NEW.timestamp
+    )'''),
+    'teacher_added': ('teacher_keys', 'INSERT', None, "json_object('id', NEW.id)"),
+    'teacher_updated': ('teacher_keys', 'UPDATE', None, "json_object('id', NEW.id)"),
+    'teacher_deleted': ('teacher_keys', 'DELETE', None, "json_object('id', OLD.id)"),
+}
+
+
+def create_event_log(cursor):
+    """Create the event_log table and the triggers that append to it.
+
+    Every worker process (and any other writer) commits its changes to the
+    same database, so appending events from triggers makes them visible to
+    the EventHub in every worker without a separate message broker.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS event_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            type TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    for event_type, (table, event, condition, payload) in EVENT_TRIGGERS.items():
+        when = f'WHEN {condition}' if condition else ''
+        # Recreated on every start so changed conditions reach existing databases
+        cursor.execute(f'DROP TRIGGER IF EXISTS trg_event_{event_type}')
+        cursor.execute(f'''
+            CREATE TRIGGER trg_event_{event_type}
+            AFTER {event} ON {table} {when}
+            BEGIN
+                INSERT INTO event_log (type, payload) VALUES ('{event_type}', {payload});
+            END
+        ''')
+
+
+class Subscription:
+    """One connected client: a bounded queue the hub pushes events into"""
+
+    def __init__(self, types, max_queue):
+        self.types = set(types) if types else None
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.backlog = []
+        self.overflowed = False
+
+    def wants(self, event):
+        return self.types is None or event['type'] in self.types
+
+    def push(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            # A client this far behind reconnects and resumes from its
+            # Last-Event-ID instead of holding events in memory
+            self.overflowed = True
+
+    def get(self, timeout):
+        """Next replayed or live event, or None after ``timeout`` idle seconds"""
+        if self.backlog:
+            return self.backlog.pop(0)
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventHub:
+    """Tails event_log and fans new rows out to this worker's subscribers.
+
+    A single daemon thread per process polls ``PRAGMA data_version`` on its
+    own connection, which only changes after another connection commits, and
+    reads new event_log rows only then. Subscribers resuming with
+    Last-Event-ID are first replayed the rows they missed.
+    """
+
+    def __init__(self, connect, poll_interval=0.5, max_subscribers=100, max_queue=1000,
+                 replay_limit=1000, retention=10000):
+        self.connect = connect
+        self.poll_interval = poll_interval
+        self.max_subscribers = max_subscribers
+        self.max_queue = max_queue
+        self.replay_limit = replay_limit
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._pid = None
+        self._thread = None
+        self._subscribers = set()
+        self._last_id = None
+        self.delivered = 0
+        self.polls = 0
+
+    def _ensure_started(self):
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            self._pid = os.getpid()
+            self._subscribers = set()
+            conn = self.connect()
+            self._last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM event_log').fetchone()[0]
+            self._thread = threading.Thread(target=self._run, args=(conn,), name='event-hub', daemon=True)
+            self._thread.start()
+
+    def subscribe(self, types=None, last_event_id=None):
+        """Register a subscriber; returns None when this worker is full.
+
+        With ``last_event_id`` the events after it are replayed first (up to
+        ``replay_limit`` of them).
+        """
+        self._ensure_started()
+        subscription = Subscription(types, self.max_queue)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            self._subscribers.add(subscription)
+            current_id = self._last_id
+
+        if last_event_id is not None:
+            conn = self.connect()
+            try:
+                rows = conn.execute('''
+                    SELECT id, type, payload FROM event_log
+                    WHERE id > ? AND id <= ?
+                    ORDER BY id
+                    LIMIT ?
+                ''', (last_event_id, current_id, self.replay_limit)).fetchall()
+            finally:
+                conn.close()
+            # Replayed rows all precede the live events the hub will push
+            for row in rows:
+                event = {'id': row[0], 'type': row[1], 'data': row[2]}
+                if subscription.wants(event):
+                    subscription.backlog.append(event)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def _run(self, conn):
+        data_version = None
+        last_prune = 0
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                self.polls += 1
+                version = conn.execute('PRAGMA data_version').fetchone()[0]
+                if version == data_version:
+                    continue
+                data_version = version
+
+                rows = conn.execute(
+                    'SELECT id, type, payload FROM event_log WHERE id > ? ORDER BY id',
+                    (self._last_id,)
+                ).fetchall()
+                with self._lock:
+                    subscribers = list(self._subscribers)
+                    if rows:
+                        self._last_id = rows[-1][0]
+                for row in rows:
+                    event = {'id': row[0], 'type': row[1], 'data': row[2]}
+                    for subscription in subscribers:
+                        if subscription.wants(event):
+                            subscription.push(event)
+                            self.delivered += 1
+
+                if time.time() - last_prune > 300:
+                    # Every worker may prune; deleting the same old rows twice is harmless
+                    last_prune = time.time()
+                    conn.execute('DELETE FROM event_log WHERE id <= ?', (self._last_id - self.retention,))
+                    conn.commit()
+            except Exception as e:
+                print(f"Error in event hub: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'subscribers': len(self._subscribers),
+                'last_event_id': self._last_id,
+                'delivered': self.delivered,
+                'polls': self.polls,
+            }
+
+
+def format_sse(event):
+    """Serialize one event in text/event-stream format"""
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {event['data']}\n\n"
+
+
+def parse_event_types(value, known):
+    """Comma-separated ?types= filter; None means every type"""
+    if not value:
+        return None
+    types = [t.strip() for t in value.split(',') if t.strip()]
+    unknown = [t for t in types if t not in known]
+    if unknown:
+        raise ValueError('Unknown event types: ' + ', '.join(unknown))
+    return types
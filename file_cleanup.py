@@ -0,0 +1,126 @@
+import os
+import queue
+import threading
+
+
+class FileDeleter:
+    """Background thread that unlinks files after their rows are gone.
+
+    Requests only queue the paths, so removing a batch of reports costs no
+    filesystem calls on the request thread. Each path is removed with a
+    single unlink; a file that is already missing is simply counted. When
+    the queue is full, or the deleter has been closed, paths are removed
+    inline so files are never leaked.
+
+    A batch may carry a ``guard``: a callable returning a context manager
+    that yields whether the files may still go. It is entered around the
+    unlinks, so the check and the removal happen together.
+    """
+
+    def __init__(self, max_queue=10000):
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._thread = None
+        self._stopping = False
+        self.deleted = 0
+        self.missing = 0
+        self.failed = 0
+        self.kept = 0
+
+    def _ensure_started(self):
+        # Started lazily, and again after a fork (gunicorn workers do not
+        # inherit the parent's threads)
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            self._pid = os.getpid()
+            self._queue = queue.Queue(maxsize=self.max_queue)
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='file-deleter', daemon=True)
+            self._thread.start()
+
+    def delete(self, paths, guard=None):
+        """Queue ``paths`` for removal"""
+        paths = list(paths)
+        if not paths:
+            return
+        if self._stopping and self._pid == os.getpid():
+            self._remove(paths, guard)
+            return
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((paths, guard))
+        except queue.Full:
+            self._remove(paths, guard)
+
+    def _remove(self, paths, guard=None):
+        if guard is None:
+            self._unlink(paths)
+            return
+        try:
+            with guard() as unused:
+                if unused:
+                    self._unlink(paths)
+                else:
+                    # Referenced again since the batch was queued
+                    with self._lock:
+                        self.kept += len(paths)
+        except Exception as e:
+            print(f"Error checking {paths[0]} before deleting: {e}")
+
+    def _unlink(self, paths):
+        for path in paths:
+            try:
+                os.remove(path)
+                result = 'deleted'
+            except FileNotFoundError:
+                result = 'missing'
+            except OSError as e:
+                result = 'failed'
+                print(f"Error deleting {path}: {e}")
+            with self._lock:
+                setattr(self, result, getattr(self, result) + 1)
+
+    def flush(self, timeout=5.0):
+        """Block until everything queued so far has been removed"""
+        if self._thread is None or self._pid != os.getpid():
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        """Remove what is still queued and stop the thread (used at exit)"""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self.flush(timeout)
+        self._stopping = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if isinstance(item, threading.Event):
+                item.set()
+            else:
+                self._remove(*item)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'deleted': self.deleted,
+                'missing': self.missing,
+                'failed': self.failed,
+                'kept': self.kept,
+                'queued': self._queue.qsize() if self._queue is not None else 0,
+            }
@@ -0,0 +1,7 @@
+# Read by gunicorn from the working directory; command-line flags override it.
+# /api/events streams hold a request thread open, so workers must be threaded.
+from config import Config
+
+worker_class = 'gthread'
+workers = Config.WEB_WORKERS
+threads = Config.WEB_THREADS
@@ -0,0 +1,162 @@
+import hashlib
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from thumbnails import THUMBNAIL_FORMATS, render_thumbnail, thumbnail_path
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+    ImageOps = None
+
+# Pillow format used when re-encoding each stored extension; GIFs (which may
+# be animated) are left untouched.
+REENCODE_FORMATS = {
+    'jpeg': 'JPEG',
+    'jpg': 'JPEG',
+    'png': 'PNG',
+    'webp': 'WEBP',
+}
+
+
+def process_image(source_path, dest_dir, thumb_dir, folder, thumb_widths, quality, max_dimension):
+    """Normalise a stored upload and pre-render its thumbnails.
+
+    Applies the EXIF orientation, drops EXIF metadata (GPS, camera serials),
+    caps the longest side at ``max_dimension`` and re-encodes to ``quality``.
+    The result is stored content-addressed next to the source. Runs inside
+    a worker process, so it only takes and returns plain values. Returns
+    the filename to store for the report (unchanged if nothing was done).
+    """
+    filename = os.path.basename(source_path)
+    extension = os.path.splitext(filename)[1].lstrip('.').lower()
+    pil_format = REENCODE_FORMATS.get(extension)
+
+    if pil_format is not None:
+        with Image.open(source_path) as image:
+            icc_profile = image.info.get('icc_profile')
+            image = ImageOps.exif_transpose(image)
+            if max(image.size) > max_dimension:
+                image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+            if pil_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+
+            options = {'optimize': True}
+            if pil_format in ('JPEG', 'WEBP'):
+                options['quality'] = quality
+            if icc_profile:
+                options['icc_profile'] = icc_profile
+
+            fd, tmp_path = tempfile.mkstemp(dir=dest_dir, prefix='.processed-')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    image.save(f, pil_format, **options)
+                digest = hashlib.sha256()
+                with open(tmp_path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(64 * 1024), b''):
+                        digest.update(chunk)
+                filename = f'{digest.hexdigest()}.{extension}'
+                os.replace(tmp_path, os.path.join(dest_dir, filename))
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+    processed_path = os.path.join(dest_dir, filename)
+    for width in thumb_widths:
+        for fmt in THUMBNAIL_FORMATS:
+            dest_path = thumbnail_path(thumb_dir, folder, filename, width, fmt)
+            if not os.path.exists(dest_path):
+                render_thumbnail(processed_path, dest_path, width, fmt, quality)
+    return filename
+
+
+class ImageJobRunner:
+    """Runs image processing off the request thread.
+
+    Uses a process pool by default so CPU-heavy decoding and encoding spread
+    across all cores; ``mode='thread'`` uses a thread pool instead. The pool
+    is created lazily in each (gunicorn worker) process. Pool processes are
+    started with ``start_method`` rather than forked from the worker, which
+    may hold locks owned by its other threads.
+    """
+
+    def __init__(self, mode='process', max_workers=None, start_method=None):
+        self.mode = mode
+        self.max_workers = max_workers
+        if start_method is None:
+            start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        self.start_method = start_method
+        self._lock = threading.Lock()
+        self._pid = None
+        self._executor = None
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+
+    def available(self):
+        """True when Pillow is installed so jobs can run"""
+        return Image is not None
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                if self.mode == 'thread':
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='image-job')
+                else:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context(self.start_method)
+                    )
+            return self._executor
+
+    def submit(self, fn, args, on_success, on_error):
+        """Run ``fn(*args)`` in the pool and report back through the callbacks.
+
+        Callbacks run in a background thread of this process once the job
+        finishes.
+        """
+        future = self._get_executor().submit(fn, *args)
+        with self._lock:
+            self.submitted += 1
+
+        def done(future):
+            error = future.exception()
+            with self._lock:
+                if error is None:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+            try:
+                if error is None:
+                    on_success(future.result())
+                else:
+                    on_error(error)
+            except Exception as e:
+                print(f"Error in image job callback: {e}")
+
+        future.add_done_callback(done)
+        return future
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor = self._executor if self._pid == os.getpid() else None
+            self._executor = None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'mode': self.mode,
+                'start_method': self.start_method,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'in_flight': self.submitted - self.completed - self.failed,
+            }
@@ -0,0 +1,226 @@
+import base64
+import binascii
+import hashlib
+import os
+import tempfile
+
+# Uploads are copied to disk in chunks of this size, so memory per upload is
+# constant no matter how large the image is.
+CHUNK_SIZE = 64 * 1024
+
+# Leading bytes identifying each accepted image type
+IMAGE_SIGNATURES = [
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+]
+
+
+class UploadError(ValueError):
+    """Raised when an uploaded image is missing, malformed or too large"""
+
+
+def detect_image_type(head):
+    """Return the file extension for an image's first bytes, or None"""
+    for signature, extension in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if len(head) >= 12 and head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+def iter_stream_chunks(stream, chunk_size=CHUNK_SIZE):
+    """Read a file-like object chunk by chunk"""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_data_url_chunks(data_url, chunk_size=CHUNK_SIZE):
+    """Decode a base64 data URL piecewise instead of into one big buffer"""
+    if not data_url.startswith('data:image') or ',' not in data_url:
+        raise UploadError('Invalid image format')
+    start = data_url.index(',') + 1
+    # Base64 decodes in groups of 4 characters
+    step = (chunk_size // 3) * 4
+    for offset in range(start, len(data_url), step):
+        try:
+            yield base64.b64decode(data_url[offset:offset + step])
+        except (binascii.Error, ValueError):
+            raise UploadError('Invalid image format')
+
+
+def save_image_chunks(chunks, dest_dir, allowed_extensions, max_bytes=None, before_replace=None):
+    """Write image chunks to ``dest_dir`` while hashing and validating them.
+
+    Files are content-addressed: the name is the SHA-256 of the bytes plus
+    the extension detected from the image's own magic bytes, so identical
+    photos are stored once and two uploads can never overwrite each other.
+    Data goes to a temporary file in the destination directory which is
+    renamed into place once the whole upload has been received;
+    ``before_replace(filename)`` is called just before that rename. Returns
+    ``(filename, sha256_hex, size)``.
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=dest_dir, prefix='.upload-')
+    digest = hashlib.sha256()
+    size = 0
+    head = b''
+    extension = None
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in chunks:
+                if extension is None:
+                    head += chunk[:16]
+                    if len(head) >= 12:
+                        extension = detect_image_type(head)
+                        if extension not in allowed_extensions:
+                            raise UploadError('Unsupported image type')
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise UploadError('Image is too large')
+                digest.update(chunk)
+                f.write(chunk)
+        if extension is None:
+            extension = detect_image_type(head)
+            if extension not in allowed_extensions:
+                raise UploadError('Unsupported image type' if size else 'Empty image upload')
+
+        sha256 = digest.hexdigest()
+        filename = f'{sha256}.{extension}'
+        if before_replace is not None:
+            before_replace(filename)
+        # Replacing an identical file is harmless and refreshes it in case a
+        # concurrent delete of its last reference just removed it.
+        os.replace(tmp_path, os.path.join(dest_dir, filename))
+        return filename, sha256, size
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def save_image(source, dest_dir, allowed_extensions, max_bytes=None, before_replace=None):
+    """Store an image given as a base64 data URL, an uploaded file or a stream"""
+    if source is None or source == '':
+        raise UploadError('Image is required')
+    if isinstance(source, str):
+        chunks = iter_data_url_chunks(source)
+    else:
+        # werkzeug FileStorage or a raw request stream
+        chunks = iter_stream_chunks(getattr(source, 'stream', source))
+    return save_image_chunks(chunks, dest_dir, allowed_extensions, max_bytes, before_replace)
+
+
+# Image columns counted in image_refs, as (folder, table, column)
+IMAGE_COLUMNS = [
+    ('before', 'hazard_reports', 'before_image'),
+    ('after', 'hazard_reports', 'after_image'),
+    ('before', 'report_attachments', 'before_image'),
+]
+
+
+def create_image_refs(cursor):
+    """Reference-count stored images from the rows that point at them.
+
+    Triggers on hazard_reports and report_attachments keep image_refs up to
+    date; a file may only be removed once its refcount drops to zero.
+    Existing rows are counted when the table is first created.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS image_refs (
+            folder TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            refcount INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (folder, filename)
+        )
+    ''')
+
+    if cursor.execute('SELECT COUNT(*) FROM image_refs').fetchone()[0] == 0:
+        for folder, table, column in IMAGE_COLUMNS:
+            cursor.execute(f'''
+                INSERT INTO image_refs (folder, filename, refcount)
+                SELECT '{folder}', {column}, COUNT(*) FROM {table}
+                WHERE {column} IS NOT NULL
+                GROUP BY {column}
+                ON CONFLICT (folder, filename) DO UPDATE SET refcount = refcount + excluded.refcount
+            ''')
+
+    for folder, table, column in IMAGE_COLUMNS:
+        increment = f'''
+            INSERT INTO image_refs (folder, filename, refcount)
+            SELECT '{folder}', NEW.{column}, 1 WHERE NEW.{column} IS NOT NULL
+            ON CONFLICT (folder, filename) DO UPDATE SET refcount = refcount + 1;
+        '''
+        decrement = f'''
+            UPDATE image_refs SET refcount = refcount - 1
+            WHERE folder = '{folder}' AND filename = OLD.{column};
+        '''
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_{column}_ref_insert
+            AFTER INSERT ON {table}
+            BEGIN {increment} END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_{column}_ref_update
+            AFTER UPDATE OF {column} ON {table}
+            WHEN OLD.{column} IS NOT NEW.{column}
+            BEGIN {decrement} {increment} END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_{column}_ref_delete
+            AFTER DELETE ON {table}
+            BEGIN {decrement} END
+        ''')
+
+
+def collect_orphans(cursor, refs):
+    """Drop image_refs rows among ``refs`` that are no longer referenced.
+
+    ``refs`` is an iterable of (folder, filename). Returns the entries whose
+    files can now be unlinked; call inside the transaction that removed the
+    references so the decision is made on committed state.
+    """
+    orphans = []
+    for folder, filename in set(refs):
+        if not filename:
+            continue
+        row = cursor.execute(
+            'SELECT refcount FROM image_refs WHERE folder = ? AND filename = ?', (folder, filename)
+        ).fetchone()
+        if row is None or row[0] <= 0:
+            cursor.execute('DELETE FROM image_refs WHERE folder = ? AND filename = ?', (folder, filename))
+            orphans.append((folder, filename))
+    return orphans
+
+
+def pin_image(cursor, folder, filename):
+    """Take an extra reference on a stored image.
+
+    Uploads pin their file before moving it into place and release it once
+    the rows using it are written, so a cleanup running in between never
+    sees the file as unreferenced.
+    """
+    cursor.execute('''
+        INSERT INTO image_refs (folder, filename, refcount) VALUES (?, ?, 1)
+        ON CONFLICT (folder, filename) DO UPDATE SET refcount = refcount + 1
+    ''', (folder, filename))
+
+
+def release_image(cursor, folder, filename):
+    """Drop a reference taken by pin_image(); returns orphans like collect_orphans()"""
+    cursor.execute(
+        'UPDATE image_refs SET refcount = refcount - 1 WHERE folder = ? AND filename = ?', (folder, filename)
+    )
+    return collect_orphans(cursor, [(folder, filename)])
+
+
+def is_unreferenced(cursor, folder, filename):
+    row = cursor.execute(
+        'SELECT refcount FROM image_refs WHERE folder = ? AND filename = ?', (folder, filename)
+    ).fetchone()
+    return row is None or row[0] <= 0
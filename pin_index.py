@@ -0,0 +1,85 @@
+import os
+import threading
+
+from db import get_data_version
+
+
+class PinIndex:
+    """In-process map of active teacher PINs.
+
+    Lookups are dictionary reads. Staleness is checked with
+    ``PRAGMA data_version`` on a dedicated connection, which only changes
+    when some other connection (any worker) has committed. Only then is the
+    teacher_keys version counter read, and the map reloaded if it moved.
+    Writers in this process call invalidate() so their changes show up
+    immediately.
+    """
+
+    def __init__(self, connect):
+        self.connect = connect
+        self._lock = threading.Lock()
+        self._pid = None
+        self._conn = None
+        self._pins = {}
+        self._data_version = None
+        self._table_version = None
+        self._invalidated = True
+        self.lookups = 0
+        self.reloads = 0
+
+    def invalidate(self):
+        """Force a reload on the next lookup (after a local write)"""
+        self._invalidated = True
+
+    def _load(self):
+        pins = {}
+        rows = self._conn.execute('''
+            SELECT id, name, pin, role, status FROM teacher_keys
+            WHERE status = 'active'
+            ORDER BY id
+        ''').fetchall()
+        for row in rows:
+            # Keep the oldest key when PINs collide, like the old fetchone()
+            pins.setdefault(row[2], {
+                'id': row[0],
+                'name': row[1],
+                'pin': row[2],
+                'role': row[3],
+                'status': row[4],
+            })
+        self._pins = pins
+        self.reloads += 1
+
+    def _refresh(self):
+        if self._pid != os.getpid():
+            # Never share the parent's connection with a forked worker
+            self._pid = os.getpid()
+            self._conn = self.connect()
+            self._invalidated = True
+
+        data_version = self._conn.execute('PRAGMA data_version').fetchone()[0]
+        if data_version == self._data_version and not self._invalidated:
+            return
+        self._data_version = data_version
+
+        table_version = get_data_version(self._conn, 'teacher_keys')
+        if table_version != self._table_version or self._invalidated:
+            self._invalidated = False
+            self._table_version = table_version
+            self._load()
+
+    def lookup(self, pin):
+        """Active teacher for ``pin`` as a dict, or None"""
+        with self._lock:
+            self._refresh()
+            self.lookups += 1
+            return self._pins.get(str(pin).strip())
+
+    def stats(self):
+        with self._lock:
+            return {
+                'active_pins': len(self._pins),
+                'lookups': self.lookups,
+                'reloads': self.reloads,
+                'table_version': self._table_version,
+            }
@@ -0,0 +1,211 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+
+
+def take_token(tokens, updated, now, rate, burst):
+    """Refill a bucket to ``now`` and try to spend one token.
+
+    Returns ``(tokens_left, allowed, retry_after_seconds)``.
+    """
+    if tokens is None:
+        tokens = burst
+    else:
+        tokens = min(burst, tokens + (now - updated) * rate)
+    if tokens >= 1:
+        return tokens - 1, True, 0
+    return tokens, False, (1 - tokens) / rate
+
+
+class MemoryBucketStore:
+    """Token buckets held in this process only (one set per gunicorn worker)"""
+
+    def __init__(self, max_keys=50000):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def take(self, key, rate, burst, now):
+        with self._lock:
+            tokens, updated, _ = self._buckets.get(key, (None, now, now))
+            tokens, allowed, retry_after = take_token(tokens, updated, now, rate, burst)
+            self._buckets[key] = (tokens, now, now + (burst - tokens) / rate)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+            return allowed, retry_after
+
+    def refund(self, key, rate, burst, now):
+        with self._lock:
+            if key in self._buckets:
+                tokens, updated, _ = self._buckets[key]
+                tokens = min(burst, tokens + (now - updated) * rate + 1)
+                self._buckets[key] = (tokens, now, now + (burst - tokens) / rate)
+
+    def _prune(self, now):
+        # A bucket that has refilled completely is the same as no bucket
+        self._buckets = {key: bucket for key, bucket in self._buckets.items() if bucket[2] > now}
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class SQLiteBucketStore:
+    """Token buckets shared by every worker through a small SQLite file.
+
+    The file is separate from the main database so throttling never adds
+    write load (or lock contention) to hazard.db.
+    """
+
+    def __init__(self, path, timeout=5.0, prune_interval=60):
+        self.path = path
+        self.timeout = timeout
+        self.prune_interval = prune_interval
+        self._lock = threading.Lock()
+        self._pid = None
+        self._conn = None
+        self._last_prune = 0
+
+    def _connect(self):
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS buckets (
+                    key TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated REAL NOT NULL,
+                    full_at REAL NOT NULL
+                )
+            ''')
+            self._conn = conn
+        return self._conn
+
+    def take(self, key, rate, burst, now):
+        with self._lock:
+            conn = self._connect()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+                tokens, updated = row if row else (None, now)
+                tokens, allowed, retry_after = take_token(tokens, updated, now, rate, burst)
+                conn.execute('''
+                    INSERT INTO buckets (key, tokens, updated, full_at) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET
+                        tokens = excluded.tokens, updated = excluded.updated, full_at = excluded.full_at
+                ''', (key, tokens, now, now + (burst - tokens) / rate))
+                if now - self._last_prune > self.prune_interval:
+                    # Fully refilled buckets carry no state worth keeping
+                    self._last_prune = now
+                    conn.execute('DELETE FROM buckets WHERE full_at < ?', (now,))
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            return allowed, retry_after
+
+    def refund(self, key, rate, burst, now):
+        with self._lock:
+            conn = self._connect()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+                if row:
+                    tokens = min(burst, row[0] + (now - row[1]) * rate + 1)
+                    conn.execute(
+                        'UPDATE buckets SET tokens = ?, updated = ?, full_at = ? WHERE key = ?',
+                        (tokens, now, now + (burst - tokens) / rate, key)
+                    )
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+
+
+class TokenBucketLimiter:
+    """Allow ``burst`` attempts per key at once, refilled at ``rate`` per second"""
+
+    def __init__(self, rate, burst, store):
+        self.rate = rate
+        self.burst = burst
+        self.store = store
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.rejected = 0
+        self.refunded = 0
+
+    def hit(self, key):
+        """Spend one token for ``key``; returns ``(allowed, retry_after)``"""
+        allowed, retry_after = self.store.take(key, self.rate, self.burst, time.time())
+        with self._lock:
+            if allowed:
+                self.allowed += 1
+            else:
+                self.rejected += 1
+        return allowed, retry_after
+
+    def refund(self, key):
+        """Give back the token spent by an attempt that should not count"""
+        self.store.refund(key, self.rate, self.burst, time.time())
+        with self._lock:
+            self.refunded += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rate': self.rate,
+                'burst': self.burst,
+                'allowed': self.allowed,
+                'rejected': self.rejected,
+                'refunded': self.refunded,
+            }
+
+
+class ThrottleSummary:
+    """Counts rejected attempts and reports them as periodic summary rows.
+
+    A throttled client costs one counter increment instead of one
+    user_activity write; every ``interval`` seconds ``write(ip, key, count)``
+    is called once per (client IP, bucket key) seen since the last flush.
+    """
+
+    def __init__(self, write, interval=60):
+        self.write = write
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._counts = {}
+        self._last_flush = time.time()
+        self.summaries = 0
+
+    def record(self, client_ip, key):
+        with self._lock:
+            self._counts[(client_ip, key)] = self._counts.get((client_ip, key), 0) + 1
+        self.maybe_flush()
+
+    def maybe_flush(self):
+        if time.time() - self._last_flush >= self.interval:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            counts, self._counts = self._counts, {}
+            self._last_flush = time.time()
+        for (client_ip, key), count in counts.items():
+            self.write(client_ip, key, count)
+            self.summaries += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pending_keys': len(self._counts),
+                'pending_rejections': sum(self._counts.values()),
+                'summaries_written': self.summaries,
+            }
+
+
+def retry_after_header(seconds):
+    """Retry-After value: whole seconds, at least 1"""
+    return str(max(1, math.ceil(seconds)))
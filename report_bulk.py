@@ -0,0 +1,111 @@
+from image_store import collect_orphans
+
+
+def parse_report_ids(value, maximum):
+    """Report ids from a JSON list or a comma-separated string, de-duplicated
+    in their original order"""
+    if isinstance(value, str):
+        value = [part for part in value.split(',') if part.strip()]
+    if not isinstance(value, list) or not value:
+        raise ValueError('ids must be a non-empty list of report ids')
+    ids = []
+    for item in value:
+        try:
+            report_id = int(item)
+        except (TypeError, ValueError):
+            raise ValueError(f'Invalid report id: {item!r}')
+        if report_id not in ids:
+            ids.append(report_id)
+    if len(ids) > maximum:
+        raise ValueError(f'At most {maximum} reports can be changed at once')
+    return ids
+
+
+def _fetch_reports(conn, columns, ids):
+    placeholders = ', '.join('?' * len(ids))
+    rows = conn.execute(f'SELECT {columns} FROM hazard_reports WHERE id IN ({placeholders})', ids).fetchall()
+    return {row['id']: row for row in rows}
+
+
+def bulk_resolve(conn, ids, resolved_at, after_filename=None, processing_state=None):
+    """Mark reports resolved in one transaction.
+
+    With ``after_filename`` every report gets that photo (reports already
+    resolved get it too, like resolving a single one again); without it,
+    reports that are already resolved are left alone. Returns
+    ``(results, updated_ids, orphans)`` with one result per id.
+    """
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        reports = _fetch_reports(conn, 'id, status, after_image', ids)
+        results = []
+        updated = []
+        for report_id in ids:
+            report = reports.get(report_id)
+            if report is None:
+                results.append({'id': report_id, 'result': 'not_found'})
+            elif after_filename is None and report['status'] == 'Resolved':
+                results.append({'id': report_id, 'result': 'already_resolved'})
+            else:
+                results.append({'id': report_id, 'result': 'resolved'})
+                updated.append(report_id)
+
+        if after_filename is None:
+            conn.executemany('''
+                UPDATE hazard_reports SET status = 'Resolved', date_resolved = ?
+                WHERE id = ?
+            ''', [(resolved_at, report_id) for report_id in updated])
+            orphans = []
+        else:
+            conn.executemany('''
+                UPDATE hazard_reports
+                SET after_image = ?, status = 'Resolved', date_resolved = ?, processing_state = ?
+                WHERE id = ?
+            ''', [(after_filename, resolved_at, processing_state, report_id) for report_id in updated])
+            # Resolving again may leave previous after images unreferenced
+            orphans = collect_orphans(conn, [('after', reports[report_id]['after_image']) for report_id in updated])
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return results, updated, orphans
+
+
+def bulk_delete(conn, ids):
+    """Delete reports and their attachments in one transaction.
+
+    Returns ``(results, orphans, map_screenshots)``: one result per id, the
+    images no other report still references and the map screenshot
+    filenames of the deleted reports. Files are left for the caller to
+    remove after the commit.
+    """
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        reports = _fetch_reports(conn, 'id, before_image, after_image, map_screenshot', ids)
+        found = [report_id for report_id in ids if report_id in reports]
+        refs = []
+        for report_id in found:
+            refs.append(('before', reports[report_id]['before_image']))
+            refs.append(('after', reports[report_id]['after_image']))
+        if found:
+            placeholders = ', '.join('?' * len(found))
+            attachments = conn.execute(
+                f'SELECT before_image FROM report_attachments WHERE report_id IN ({placeholders})', found
+            ).fetchall()
+            refs.extend(('before', row['before_image']) for row in attachments)
+
+        # Triggers drop the image reference counts
+        conn.executemany('DELETE FROM report_attachments WHERE report_id = ?', [(report_id,) for report_id in found])
+        conn.executemany('DELETE FROM hazard_reports WHERE id = ?', [(report_id,) for report_id in found])
+        orphans = collect_orphans(conn, refs)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+    results = [
+        {'id': report_id, 'result': 'deleted' if report_id in reports else 'not_found'}
+        for report_id in ids
+    ]
+    map_screenshots = [reports[report_id]['map_screenshot'] for report_id in found if reports[report_id]['map_screenshot']]
+    return results, orphans, map_screenshots
@@ -0,0 +1,156 @@
+import math
+import threading
+from collections import OrderedDict
+
+from db import get_data_version
+from spatial import bbox_clause
+
+
+def parse_zoom(value, max_zoom):
+    try:
+        zoom = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('zoom must be an integer')
+    if zoom < 0 or zoom > max_zoom:
+        raise ValueError(f'zoom must be between 0 and {max_zoom}')
+    return zoom
+
+
+class ClusterIndex:
+    """Server-side clustering of report locations, cached per map tile.
+
+    At zoom ``z`` the world is split into 2^z tiles per 360 degrees of
+    longitude (square, equal-angle tiles), and each tile into ``grid`` x
+    ``grid`` cells. Reports in the same cell form one cluster, placed at
+    their mean position and broken down by status. Tiles are computed with
+    one grouped query over the R*Tree and kept in an LRU cache that is
+    emptied whenever the hazard_reports data version moves.
+    """
+
+    def __init__(self, grid=4, cache_size=4096, max_tiles=64):
+        self.grid = grid
+        self.cache_size = cache_size
+        self.max_tiles = max_tiles
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+
+    def _cell_degrees(self, zoom):
+        return 360.0 / (2 ** zoom * self.grid)
+
+    def _tile_range(self, zoom, bbox):
+        min_lon, min_lat, max_lon, max_lat = bbox
+        tile_degrees = 360.0 / 2 ** zoom
+        x_tiles = 2 ** zoom
+        y_tiles = max(1, math.ceil(180.0 / tile_degrees))
+
+        def index(value, origin, count):
+            return min(max(int(math.floor((value + origin) / tile_degrees)), 0), count - 1)
+
+        return (
+            range(index(min_lon, 180, x_tiles), index(max_lon, 180, x_tiles) + 1),
+            range(index(min_lat, 90, y_tiles), index(max_lat, 90, y_tiles) + 1),
+        )
+
+    def clusters(self, conn, zoom, bbox):
+        """Clusters in the cells overlapping ``bbox`` at ``zoom``"""
+        xs, ys = self._tile_range(zoom, bbox)
+        if len(xs) * len(ys) > self.max_tiles:
+            raise ValueError('bbox covers too many tiles at this zoom level')
+        tiles = [(zoom, x, y) for y in ys for x in xs]
+
+        version = get_data_version(conn, 'hazard_reports')
+        found = {}
+        with self._lock:
+            if version != self._version:
+                self._cache.clear()
+                self._version = version
+            for tile in tiles:
+                if tile in self._cache:
+                    self._cache.move_to_end(tile)
+                    found[tile] = self._cache[tile]
+            self.hits += len(found)
+            self.misses += len(tiles) - len(found)
+
+        missing = [tile for tile in tiles if tile not in found]
+        if missing:
+            computed = self._compute(conn, zoom, missing)
+            found.update(computed)
+            with self._lock:
+                # A concurrent write may already have moved the version on
+                if version == self._version:
+                    self._cache.update(computed)
+                    while len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+
+        cell = self._cell_degrees(zoom)
+        min_lon, min_lat, max_lon, max_lat = bbox
+        result = []
+        for tile in tiles:
+            for x, y, cluster in found[tile]:
+                west, south = x * cell - 180, y * cell - 90
+                if west <= max_lon and west + cell >= min_lon and south <= max_lat and south + cell >= min_lat:
+                    result.append(cluster)
+        return result
+
+    def _compute(self, conn, zoom, tiles):
+        # One query over the rectangle spanning every missing tile; rows in
+        # tiles that were already cached are ignored
+        tile_degrees = 360.0 / 2 ** zoom
+        min_x = min(x for _, x, _ in tiles)
+        max_x = max(x for _, x, _ in tiles)
+        min_y = min(y for _, _, y in tiles)
+        max_y = max(y for _, _, y in tiles)
+        rect = (
+            min_x * tile_degrees - 180, min_y * tile_degrees - 90,
+            (max_x + 1) * tile_degrees - 180, (max_y + 1) * tile_degrees - 90,
+        )
+        where, params = bbox_clause(rect)
+
+        cell = self._cell_degrees(zoom)
+        x_cells = 2 ** zoom * self.grid
+        y_cells = max(1, math.ceil(180.0 / cell))
+        rows = conn.execute(f'''
+            SELECT MAX(0, MIN(CAST((longitude + 180) / ? AS INTEGER), ?)) AS cx,
+                   MAX(0, MIN(CAST((latitude + 90) / ? AS INTEGER), ?)) AS cy,
+                   status, COUNT(*), SUM(latitude), SUM(longitude), MIN(id)
+            FROM hazard_reports
+            WHERE {where}
+            GROUP BY cx, cy, status
+        ''', [cell, x_cells - 1, cell, y_cells - 1] + params).fetchall()
+
+        cells = {}
+        for x, y, status, count, lat_sum, lon_sum, first_id in rows:
+            tile = (zoom, x // self.grid, y // self.grid)
+            entry = cells.setdefault((tile, x, y), {'count': 0, 'lat': 0.0, 'lon': 0.0, 'statuses': {}, 'id': first_id})
+            entry['count'] += count
+            entry['lat'] += lat_sum
+            entry['lon'] += lon_sum
+            entry['statuses'][status] = entry['statuses'].get(status, 0) + count
+
+        computed = {tile: [] for tile in tiles}
+        for (tile, x, y), entry in cells.items():
+            if tile not in computed:
+                continue
+            cluster = {
+                'lat': round(entry['lat'] / entry['count'], 6),
+                'lon': round(entry['lon'] / entry['count'], 6),
+                'count': entry['count'],
+                'statuses': entry['statuses'],
+            }
+            if entry['count'] == 1:
+                # A lone report is drawn as its own marker
+                cluster['id'] = entry['id']
+            computed[tile].append((x, y, cluster))
+        return computed
+
+    def stats(self):
+        with self._lock:
+            return {
+                'cached_tiles': len(self._cache),
+                'data_version': self._version,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
@@ -0,0 +1,62 @@
+import json
+
+from streaming import NDJSON_MIMETYPE, coalesce, csv_chunks, gzip_chunks, iter_rows, ndjson_lines
+
+# Columns included in exports; RFID codes and internal state stay out
+REPORT_EXPORT_COLUMNS = [
+    'id', 'status', 'description', 'latitude', 'longitude', 'date_reported', 'date_resolved',
+    'user_name', 'user_role', 'before_image', 'after_image', 'map_screenshot',
+]
+
+# format -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'geojson': ('application/geo+json', 'geojson'),
+    'ndjson': (NDJSON_MIMETYPE, 'ndjson'),
+}
+
+
+def geojson_chunks(rows):
+    """A GeoJSON FeatureCollection with one Point feature per report"""
+    yield '{"type": "FeatureCollection", "features": ['
+    separator = ''
+    for row in rows:
+        properties = {column: row[column] for column in REPORT_EXPORT_COLUMNS
+                      if column not in ('id', 'latitude', 'longitude')}
+        feature = {
+            'type': 'Feature',
+            'id': row['id'],
+            # GeoJSON positions are longitude first
+            'geometry': {'type': 'Point', 'coordinates': [row['longitude'], row['latitude']]},
+            'properties': properties,
+        }
+        yield separator + json.dumps(feature, default=str)
+        separator = ','
+    yield ']}\n'
+
+
+def export_chunks(cursor, fmt, compress=False):
+    """Serialise an executed export query as ``fmt``, optionally gzipped.
+
+    Rows are read with fetchmany() and written out as they arrive, so memory
+    use does not grow with the number of reports.
+    """
+    rows = iter_rows(cursor)
+    if fmt == 'csv':
+        chunks = csv_chunks(REPORT_EXPORT_COLUMNS, rows)
+    elif fmt == 'geojson':
+        chunks = coalesce(geojson_chunks(rows))
+    else:
+        chunks = coalesce(ndjson_lines(rows))
+    return gzip_chunks(chunks) if compress else chunks
+
+
+def export_filename(fmt, compress=False):
+    return 'hazard_reports.' + EXPORT_FORMATS[fmt][1] + ('.gz' if compress else '')
+
+
+def parse_export_format(value):
+    fmt = (value or 'csv').lower()
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError('format must be one of ' + ', '.join(EXPORT_FORMATS))
+    return fmt
@@ -0,0 +1,135 @@
+import base64
+import json
+
+from spatial import spatial_filters
+
+# Filters accepted by the report listing endpoints, mapped to their column.
+# Every combination of equality filters has a composite index ending in
+# (date_reported, id), so a page is always an index range scan.
+EQUALITY_FILTERS = {
+    'status': 'status',
+    'role': 'user_role',
+    'reporter': 'user_name',
+}
+
+REPORT_INDEXES = [
+    ('idx_hazard_reports_date', '(date_reported, id)'),
+    ('idx_hazard_reports_status_date', '(status, date_reported, id)'),
+    ('idx_hazard_reports_role_date', '(user_role, date_reported, id)'),
+    ('idx_hazard_reports_reporter_date', '(user_name, date_reported, id)'),
+    ('idx_hazard_reports_status_role_date', '(status, user_role, date_reported, id)'),
+    ('idx_hazard_reports_status_reporter_date', '(status, user_name, date_reported, id)'),
+    ('idx_hazard_reports_role_reporter_date', '(user_role, user_name, date_reported, id)'),
+    ('idx_hazard_reports_status_role_reporter_date', '(status, user_role, user_name, date_reported, id)'),
+]
+
+
+def create_report_indexes(cursor):
+    """Create the indexes backing report filters and keyset pagination"""
+    for name, columns in REPORT_INDEXES:
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON hazard_reports {columns}')
+
+
+def encode_cursor(date_reported, report_id):
+    """Turn the last row of a page into an opaque cursor token"""
+    raw = json.dumps([str(date_reported), report_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """Inverse of encode_cursor; raises ValueError for malformed tokens"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        date_reported, report_id = json.loads(base64.urlsafe_b64decode(padded))
+        return str(date_reported), int(report_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def date_bound(value, end_of_day=False):
+    """Normalise a ?from=/?to= value; plain dates (YYYY-MM-DD) cover the
+    whole day when used as an upper bound"""
+    if len(value) == 10 and end_of_day:
+        return value + ' 23:59:59.999999'
+    return value.replace('T', ' ')
+
+
+def build_report_filters(args):
+    """Build WHERE clauses and parameters from request arguments"""
+    clauses = []
+    params = []
+
+    for arg, column in EQUALITY_FILTERS.items():
+        value = args.get(arg)
+        if value and value != 'all':
+            clauses.append(f'{column} = ?')
+            params.append(value)
+
+    date_from = args.get('from')
+    if date_from:
+        clauses.append('date_reported >= ?')
+        params.append(date_bound(date_from))
+
+    date_to = args.get('to')
+    if date_to:
+        clauses.append('date_reported <= ?')
+        params.append(date_bound(date_to, end_of_day=True))
+
+    # ?bbox= and ?near=&radius= are answered from the R*Tree
+    spatial_clauses, spatial_params = spatial_filters(args)
+    clauses.extend(spatial_clauses)
+    params.extend(spatial_params)
+
+    return clauses, params
+
+
+def parse_limit(args, default, maximum):
+    """Read the page size argument, clamped to the maximum (if any)"""
+    value = args.get('limit')
+    if value in (None, ''):
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    return min(limit, maximum) if maximum else limit
+
+
+def build_report_query(args, limit=None, columns='*'):
+    """Build the listing query for the given filters and cursor, newest first"""
+    clauses, params = build_report_filters(args)
+
+    cursor_token = args.get('cursor')
+    if cursor_token:
+        date_reported, report_id = decode_cursor(cursor_token)
+        clauses.append('(date_reported, id) < (?, ?)')
+        params.extend([date_reported, report_id])
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+    sql = f'''
+        SELECT {columns} FROM hazard_reports
+        {where}
+        ORDER BY date_reported DESC, id DESC
+    '''
+    if limit is not None:
+        sql += ' LIMIT ?'
+        params.append(limit)
+    return sql, params
+
+
+def fetch_report_page(conn, args, limit):
+    """Fetch one page of reports, newest first, using keyset pagination.
+
+    Returns ``(rows, next_cursor)``; ``next_cursor`` is None on the last page.
+    """
+    sql, params = build_report_query(args, limit + 1)
+    rows = conn.execute(sql, params).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last['date_reported'], last['id'])
+    return rows, next_cursor
@@ -0,0 +1,194 @@
+# Upper bounds (in hours) of the time-to-resolve histogram buckets; anything
+# slower falls into a final open-ended bucket.
+RESOLVE_BUCKET_HOURS = [1, 6, 12, 24, 48, 72, 168, 336, 720, 2160]
+
+RESOLVE_SECONDS_SQL = "(julianday({row}.date_resolved) - julianday({row}.date_reported)) * 86400"
+
+
+def resolve_bucket_sql(row):
+    """CASE ladder mapping a row's time-to-resolve to its bucket number"""
+    seconds = RESOLVE_SECONDS_SQL.format(row=row)
+    ladder = ' '.join(
+        f'WHEN {seconds} <= {hours * 3600} THEN {bucket}'
+        for bucket, hours in enumerate(RESOLVE_BUCKET_HOURS)
+    )
+    return f'CASE {ladder} ELSE {len(RESOLVE_BUCKET_HOURS)} END'
+
+
+def is_resolved_sql(row):
+    return f"{row}.status = 'Resolved' AND {row}.date_resolved IS NOT NULL"
+
+
+def add_row_sql(row):
+    """Statements adding one hazard_reports row (NEW or OLD) to the summaries"""
+    return f'''
+        INSERT INTO report_status_counts (status, count) VALUES ({row}.status, 1)
+        ON CONFLICT(status) DO UPDATE SET count = count + 1;
+        INSERT INTO report_daily_counts (day, reported, resolved) VALUES (date({row}.date_reported), 1, 0)
+        ON CONFLICT(day) DO UPDATE SET reported = reported + 1;
+        INSERT INTO report_daily_counts (day, reported, resolved)
+        SELECT date({row}.date_resolved), 0, 1 WHERE {is_resolved_sql(row)}
+        ON CONFLICT(day) DO UPDATE SET resolved = resolved + 1;
+        INSERT INTO report_resolve_times (bucket, count, total_seconds)
+        SELECT {resolve_bucket_sql(row)}, 1, {RESOLVE_SECONDS_SQL.format(row=row)} WHERE {is_resolved_sql(row)}
+        ON CONFLICT(bucket) DO UPDATE SET count = count + 1, total_seconds = total_seconds + excluded.total_seconds;
+    '''
+
+
+def remove_row_sql(row):
+    """Statements taking one hazard_reports row (NEW or OLD) out of the summaries"""
+    return f'''
+        UPDATE report_status_counts SET count = count - 1 WHERE status = {row}.status;
+        UPDATE report_daily_counts SET reported = reported - 1 WHERE day = date({row}.date_reported);
+        UPDATE report_daily_counts SET resolved = resolved - 1
+        WHERE day = date({row}.date_resolved) AND {is_resolved_sql(row)};
+        UPDATE report_resolve_times
+        SET count = count - 1, total_seconds = total_seconds - {RESOLVE_SECONDS_SQL.format(row=row)}
+        WHERE bucket = {resolve_bucket_sql(row)} AND {is_resolved_sql(row)};
+    '''
+
+
+def create_report_stats(cursor):
+    """Create the dashboard summary tables and the triggers that maintain them.
+
+    Every insert, delete and status/date change on hazard_reports adjusts a
+    few small rows here, so reading the statistics never touches
+    hazard_reports itself. The summaries are filled from hazard_reports when
+    first created.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS report_status_counts (
+            status TEXT PRIMARY KEY,
+            count INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS report_daily_counts (
+            day TEXT PRIMARY KEY,
+            reported INTEGER NOT NULL DEFAULT 0,
+            resolved INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS report_resolve_times (
+            bucket INTEGER PRIMARY KEY,
+            count INTEGER NOT NULL DEFAULT 0,
+            total_seconds REAL NOT NULL DEFAULT 0
+        )
+    ''')
+
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_hazard_reports_stats_insert
+        AFTER INSERT ON hazard_reports
+        BEGIN
+            {add_row_sql('NEW')}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_hazard_reports_stats_delete
+        AFTER DELETE ON hazard_reports
+        BEGIN
+            {remove_row_sql('OLD')}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_hazard_reports_stats_update
+        AFTER UPDATE OF status, date_reported, date_resolved ON hazard_reports
+        BEGIN
+            {remove_row_sql('OLD')}
+            {add_row_sql('NEW')}
+        END
+    ''')
+
+    cursor.execute('SELECT COUNT(*) FROM report_status_counts')
+    if cursor.fetchone()[0] == 0:
+        rebuild_report_stats(cursor)
+
+
+def rebuild_report_stats(cursor):
+    """Recompute every summary table from hazard_reports (full scan)"""
+    cursor.execute('DELETE FROM report_status_counts')
+    cursor.execute('DELETE FROM report_daily_counts')
+    cursor.execute('DELETE FROM report_resolve_times')
+
+    cursor.execute('''
+        INSERT INTO report_status_counts (status, count)
+        SELECT status, COUNT(*) FROM hazard_reports GROUP BY status
+    ''')
+    cursor.execute(f'''
+        INSERT INTO report_daily_counts (day, reported, resolved)
+        SELECT day, SUM(reported), SUM(resolved) FROM (
+            SELECT date(date_reported) AS day, 1 AS reported, 0 AS resolved FROM hazard_reports
+            UNION ALL
+            SELECT date(date_resolved), 0, 1 FROM hazard_reports r WHERE {is_resolved_sql('r')}
+        )
+        GROUP BY day
+    ''')
+    cursor.execute(f'''
+        INSERT INTO report_resolve_times (bucket, count, total_seconds)
+        SELECT {resolve_bucket_sql('r')} AS bucket, COUNT(*), SUM({RESOLVE_SECONDS_SQL.format(row='r')})
+        FROM hazard_reports r
+        WHERE {is_resolved_sql('r')}
+        GROUP BY bucket
+    ''')
+
+
+def status_counts(conn):
+    """Report totals per status, plus 'total'"""
+    counts = {'Pending': 0, 'Resolved': 0}
+    rows = conn.execute('SELECT status, count FROM report_status_counts WHERE count > 0').fetchall()
+    counts.update({row[0]: row[1] for row in rows})
+    counts['total'] = sum(row[1] for row in rows)
+    return counts
+
+
+def daily_counts(conn, days):
+    """Reports filed and resolved per day for the latest ``days`` days with activity"""
+    rows = conn.execute('''
+        SELECT day, reported, resolved FROM report_daily_counts
+        WHERE reported > 0 OR resolved > 0
+        ORDER BY day DESC
+        LIMIT ?
+    ''', (days,)).fetchall()
+    return [{'day': row[0], 'reported': row[1], 'resolved': row[2]} for row in reversed(rows)]
+
+
+def resolve_time_stats(conn, percentiles=(50, 90)):
+    """Mean time-to-resolve and histogram-estimated percentiles, in hours"""
+    rows = dict(
+        (row[0], (row[1], row[2]))
+        for row in conn.execute('SELECT bucket, count, total_seconds FROM report_resolve_times WHERE count > 0')
+    )
+    histogram = []
+    for bucket in range(len(RESOLVE_BUCKET_HOURS) + 1):
+        upper = RESOLVE_BUCKET_HOURS[bucket] if bucket < len(RESOLVE_BUCKET_HOURS) else None
+        histogram.append({'le_hours': upper, 'count': rows.get(bucket, (0, 0))[0]})
+
+    total = sum(count for count, _ in rows.values())
+    stats = {
+        'count': total,
+        'mean_hours': round(sum(seconds for _, seconds in rows.values()) / total / 3600, 2) if total else None,
+        'histogram': histogram,
+    }
+    for p in percentiles:
+        stats[f'p{p}_hours'] = histogram_percentile(histogram, total, p)
+    return stats
+
+
+def histogram_percentile(histogram, total, p):
+    """Estimate the p-th percentile by interpolating inside its bucket"""
+    if not total:
+        return None
+    rank = total * p / 100
+    seen = 0
+    lower = 0
+    for entry in histogram:
+        if entry['count'] and seen + entry['count'] >= rank:
+            if entry['le_hours'] is None:
+                # Open-ended bucket: all we know is that it is beyond the last bound
+                return lower
+            fraction = (rank - seen) / entry['count']
+            return round(lower + (entry['le_hours'] - lower) * fraction, 2)
+        seen += entry['count']
+        lower = entry['le_hours'] if entry['le_hours'] is not None else lower
+    return lower
@@ -0,0 +1,101 @@
+import gzip
+import os
+import re
+import shutil
+import tempfile
+import threading
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip siblings are always generated
+    brotli = None
+
+# Relative asset references emitted by the Vite build (base: './')
+ASSET_REF = re.compile(r'''(?P<attr>src|href)="\./assets/(?P<name>[^"]+)"''')
+
+# Encodings we pre-compress to, best first, with their file suffix
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+# Only text assets are worth compressing; images are already compressed
+COMPRESSIBLE_EXTENSIONS = ('.js', '.css', '.svg', '.json', '.html')
+
+
+class RfidShell:
+    """The RFID login page, rendered once and reloaded only when it changes.
+
+    Asset paths are rewritten from the page's own ``./assets/...``
+    references, so a new build never needs code changes.
+    """
+
+    def __init__(self, html_path, assets_dir):
+        self.html_path = html_path
+        self.assets_dir = assets_dir
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._content = None
+
+    def render(self, asset_url):
+        """Return the page with asset paths rewritten by ``asset_url(name)``"""
+        mtime = os.stat(self.html_path).st_mtime_ns
+        if mtime == self._mtime:
+            return self._content
+        with self._lock:
+            if mtime != self._mtime:
+                with open(self.html_path, 'r') as f:
+                    html = f.read()
+                self._content = ASSET_REF.sub(
+                    lambda m: f'{m.group("attr")}="{asset_url(m.group("name"))}"', html
+                )
+                self._mtime = mtime
+            return self._content
+
+    def precompress_assets(self):
+        """Write compressed siblings for every asset; returns how many were checked"""
+        if not os.path.isdir(self.assets_dir):
+            return 0
+        names = [name for name in sorted(os.listdir(self.assets_dir)) if name.endswith(COMPRESSIBLE_EXTENSIONS)]
+        for name in names:
+            precompress(os.path.join(self.assets_dir, name))
+        return len(names)
+
+
+def precompress(path):
+    """Write .gz (and .br when brotli is installed) siblings of ``path``.
+
+    Siblings are only rebuilt when missing or older than the source.
+    """
+    if not path.endswith(COMPRESSIBLE_EXTENSIONS) or not os.path.isfile(path):
+        return
+    source_mtime = os.path.getmtime(path)
+    for encoding, suffix in ENCODINGS:
+        if encoding == 'br' and brotli is None:
+            continue
+        target = path + suffix
+        if os.path.exists(target) and os.path.getmtime(target) >= source_mtime:
+            continue
+        fd, tmp_target = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with open(path, 'rb') as src, os.fdopen(fd, 'wb') as raw:
+                if encoding == 'gzip':
+                    with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=9, mtime=0) as dst:
+                        shutil.copyfileobj(src, dst)
+                else:
+                    raw.write(brotli.compress(src.read(), quality=11))
+            os.chmod(tmp_target, 0o644)
+            os.replace(tmp_target, target)
+        except BaseException:
+            os.unlink(tmp_target)
+            raise
+
+
+def negotiate_encoding(path, accept_encodings):
+    """Pick the best pre-compressed sibling the client accepts.
+
+    Siblings are written by precompress() at startup or by
+    ``flask precompress-assets``, never while serving a request. Returns
+    ``(path_to_send, content_encoding or None)``.
+    """
+    for encoding, suffix in ENCODINGS:
+        if accept_encodings[encoding] and os.path.exists(path + suffix):
+            return path + suffix, encoding
+    return path, None
@@ -0,0 +1,146 @@
+import html
+import re
+
+# Searchable text per source: FTS5 index, indexed table and column, and the
+# extra columns returned with each hit
+SEARCH_SOURCES = {
+    'reports': {
+        'fts': 'hazard_reports_fts',
+        'table': 'hazard_reports',
+        'column': 'description',
+        'columns': ['id', 'status', 'date_reported', 'user_name', 'user_role'],
+    },
+    'feedback': {
+        'fts': 'feedback_fts',
+        'table': 'feedback',
+        'column': 'message',
+        'columns': ['id', 'name', 'category', 'created_at'],
+    },
+}
+
+# Markers FTS5 wraps around matches; swapped for <mark> after HTML-escaping
+MATCH_START = '\x02'
+MATCH_END = '\x03'
+
+SEARCH_TERM = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def create_search_index(cursor):
+    """Create the FTS5 indexes and the triggers that keep them in sync.
+
+    The indexes are external-content tables over the source columns, so the
+    text itself is not stored twice. A newly created index is filled from
+    its table straight away.
+    """
+    for source in SEARCH_SOURCES.values():
+        fts, table, column = source['fts'], source['table'], source['column']
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts,))
+        exists = cursor.fetchone() is not None
+
+        cursor.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                {column}, content='{table}', content_rowid='id', tokenize='porter unicode61'
+            )
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{fts}_insert AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO {fts} (rowid, {column}) VALUES (NEW.id, NEW.{column});
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{fts}_delete AFTER DELETE ON {table}
+            BEGIN
+                INSERT INTO {fts} ({fts}, rowid, {column}) VALUES ('delete', OLD.id, OLD.{column});
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{fts}_update AFTER UPDATE OF {column} ON {table}
+            BEGIN
+                INSERT INTO {fts} ({fts}, rowid, {column}) VALUES ('delete', OLD.id, OLD.{column});
+                INSERT INTO {fts} (rowid, {column}) VALUES (NEW.id, NEW.{column});
+            END
+        ''')
+
+        if not exists:
+            cursor.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+
+def rebuild_search_index(cursor):
+    """Rebuild every FTS5 index from its source table"""
+    for source in SEARCH_SOURCES.values():
+        cursor.execute(f"INSERT INTO {source['fts']} ({source['fts']}) VALUES ('rebuild')")
+        cursor.execute(f"INSERT INTO {source['fts']} ({source['fts']}) VALUES ('optimize')")
+
+
+def build_match_query(text):
+    """Turn free text into an FTS5 MATCH expression.
+
+    Words are ANDed together and "quoted text" is kept as a phrase. Every
+    term is quoted, so FTS5 operators and punctuation typed by the user
+    are searched for literally instead of raising syntax errors.
+    """
+    terms = []
+    for phrase, word in SEARCH_TERM.findall(text or ''):
+        term = (phrase or word).strip()
+        if term:
+            terms.append('"' + term.replace('"', '""') + '"')
+    if not terms:
+        raise ValueError('Search query is required')
+    return ' '.join(terms)
+
+
+def mark_matches(text):
+    """HTML-escape FTS5 output and turn its match markers into <mark> tags"""
+    if text is None:
+        return None
+    return html.escape(text).replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>')
+
+
+def search_source(conn, name, match, limit, offset=0):
+    """Ranked hits from one source, best (lowest bm25) first"""
+    source = SEARCH_SOURCES[name]
+    fts = source['fts']
+    columns = ', '.join(f't.{column}' for column in source['columns'])
+    rows = conn.execute(f'''
+        SELECT {columns},
+               highlight({fts}, 0, ?, ?) AS highlight,
+               snippet({fts}, 0, ?, ?, '…', 24) AS snippet,
+               bm25({fts}) AS score
+        FROM {fts}
+        JOIN {source['table']} t ON t.id = {fts}.rowid
+        WHERE {fts} MATCH ?
+        ORDER BY rank
+        LIMIT ? OFFSET ?
+    ''', (MATCH_START, MATCH_END, MATCH_START, MATCH_END, match, limit, offset)).fetchall()
+
+    hits = []
+    for row in rows:
+        hit = {column: row[i] for i, column in enumerate(source['columns'])}
+        hit['source'] = name
+        hit['highlight'] = mark_matches(row['highlight'])
+        hit['snippet'] = mark_matches(row['snippet'])
+        hit['score'] = row['score']
+        hits.append(hit)
+    return hits
+
+
+def search(conn, text, sources, limit, offset=0):
+    """Search ``sources`` for ``text``; returns ``(hits, next_offset)``.
+
+    Hits from several sources are merged by bm25 score. One extra row is
+    read per source to know whether another page exists.
+    """
+    match = build_match_query(text)
+    if len(sources) == 1:
+        hits = search_source(conn, sources[0], match, limit + 1, offset)
+    else:
+        # Each source has to supply every row up to the end of the page
+        hits = []
+        for name in sources:
+            hits.extend(search_source(conn, name, match, offset + limit + 1))
+        hits.sort(key=lambda hit: hit['score'])
+        hits = hits[offset:]
+
+    next_offset = offset + limit if len(hits) > limit else None
+    return hits[:limit], next_offset
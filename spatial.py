@@ -0,0 +1,161 @@
+import math
+
+EARTH_RADIUS_M = 6371008.8
+
+# ?near= queries without an explicit ?radius= (metres)
+DEFAULT_RADIUS_M = 250
+MAX_RADIUS_M = 50000
+
+
+def create_spatial_index(cursor):
+    """Create the R*Tree over report coordinates and keep it in sync.
+
+    Each report is stored as a degenerate box (a point). Triggers mirror
+    inserts, coordinate changes and deletes, and existing rows are backfilled.
+    """
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS hazard_reports_rtree USING rtree(
+            id, min_lat, max_lat, min_lon, max_lon
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_hazard_reports_rtree_insert
+        AFTER INSERT ON hazard_reports
+        BEGIN
+            INSERT INTO hazard_reports_rtree (id, min_lat, max_lat, min_lon, max_lon)
+            VALUES (NEW.id, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_hazard_reports_rtree_update
+        AFTER UPDATE OF latitude, longitude ON hazard_reports
+        BEGIN
+            UPDATE hazard_reports_rtree
+            SET min_lat = NEW.latitude, max_lat = NEW.latitude,
+                min_lon = NEW.longitude, max_lon = NEW.longitude
+            WHERE id = NEW.id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_hazard_reports_rtree_delete
+        AFTER DELETE ON hazard_reports
+        BEGIN
+            DELETE FROM hazard_reports_rtree WHERE id = OLD.id;
+        END
+    ''')
+    cursor.execute('''
+        INSERT INTO hazard_reports_rtree (id, min_lat, max_lat, min_lon, max_lon)
+        SELECT id, latitude, latitude, longitude, longitude FROM hazard_reports
+        WHERE id NOT IN (SELECT id FROM hazard_reports_rtree)
+    ''')
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in metres"""
+    if None in (lat1, lon1, lat2, lon2):
+        return None
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def register_functions(conn):
+    """Make haversine_m() callable from SQL on ``conn``"""
+    conn.create_function('haversine_m', 4, haversine_m, deterministic=True)
+
+
+def bbox_around(lat, lon, radius_m):
+    """Bounding box (min_lon, min_lat, max_lon, max_lat) enclosing a circle"""
+    d_lat = math.degrees(radius_m / EARTH_RADIUS_M)
+    cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+    d_lon = min(math.degrees(radius_m / (EARTH_RADIUS_M * cos_lat)), 180.0)
+    return (lon - d_lon, max(lat - d_lat, -90.0), lon + d_lon, min(lat + d_lat, 90.0))
+
+
+def parse_bbox(value):
+    """Parse ``min_lon,min_lat,max_lon,max_lat`` (GeoJSON order)"""
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(part) for part in value.split(','))
+    except ValueError:
+        raise ValueError('bbox must be min_lon,min_lat,max_lon,max_lat')
+    if min_lon > max_lon or min_lat > max_lat:
+        raise ValueError('bbox minimums must not exceed maximums')
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def parse_near(value, radius=None):
+    """Parse ``lat,lon`` plus an optional radius in metres"""
+    try:
+        lat, lon = (float(part) for part in value.split(','))
+    except ValueError:
+        raise ValueError('near must be lat,lon')
+    if radius in (None, ''):
+        radius_m = DEFAULT_RADIUS_M
+    else:
+        try:
+            radius_m = float(radius)
+        except ValueError:
+            raise ValueError('radius must be a number of metres')
+    if radius_m <= 0 or radius_m > MAX_RADIUS_M:
+        raise ValueError(f'radius must be between 0 and {MAX_RADIUS_M} metres')
+    return lat, lon, radius_m
+
+
+def bbox_clause(bbox, column='id'):
+    """SQL restricting reports to ``bbox``.
+
+    The R*Tree narrows ``column`` to candidate ids. It stores 32-bit floats
+    rounded outwards, so it can return points just outside the box; the
+    report's own coordinates are then compared exactly.
+    """
+    min_lon, min_lat, max_lon, max_lat = bbox
+    sql = f'''{column} IN (
+        SELECT id FROM hazard_reports_rtree
+        WHERE max_lat >= ? AND min_lat <= ? AND max_lon >= ? AND min_lon <= ?
+    ) AND latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?'''
+    return sql, [min_lat, max_lat, min_lon, max_lon, min_lat, max_lat, min_lon, max_lon]
+
+
+def spatial_filters(args):
+    """WHERE clauses and parameters for ?bbox= and ?near=&radius="""
+    clauses = []
+    params = []
+
+    if args.get('bbox'):
+        sql, values = bbox_clause(parse_bbox(args['bbox']))
+        clauses.append(sql)
+        params.extend(values)
+
+    if args.get('near'):
+        lat, lon, radius_m = parse_near(args['near'], args.get('radius'))
+        sql, values = bbox_clause(bbox_around(lat, lon, radius_m))
+        clauses.append(sql)
+        params.extend(values)
+        clauses.append('haversine_m(latitude, longitude, ?, ?) <= ?')
+        params.extend([lat, lon, radius_m])
+
+    return clauses, params
+
+
+def find_nearby_pending(conn, lat, lon, radius_m, since, limit):
+    """Open (Pending) reports within ``radius_m`` reported after ``since``.
+
+    The R*Tree narrows the search to a small box around the point before
+    the status/time filter and exact distance check, so the cost depends on
+    local density rather than on the number of open reports.
+    """
+    sql, params = bbox_clause(bbox_around(lat, lon, radius_m))
+    return conn.execute(f'''
+        SELECT id, description, latitude, longitude, date_reported,
+               haversine_m(latitude, longitude, ?, ?) AS distance_m
+        FROM hazard_reports
+        WHERE {sql}
+          AND status = 'Pending'
+          AND date_reported >= ?
+          AND haversine_m(latitude, longitude, ?, ?) <= ?
+        ORDER BY distance_m
+        LIMIT ?
+    ''', [lat, lon] + params + [since, lat, lon, radius_m, limit]).fetchall()
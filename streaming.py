@@ -0,0 +1,136 @@
+import csv
+import io
+import json
+import zlib
+
+from flask import Response
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+# Rows pulled from the cursor per fetchmany() call while streaming
+FETCH_BATCH_SIZE = 500
+
+
+def requested_stream_format(request):
+    """Return 'ndjson', 'json' or None for a buffered response.
+
+    NDJSON is chosen with ?format=ndjson or an Accept header naming
+    application/x-ndjson; a streamed JSON array with ?stream=1.
+    """
+    fmt = request.args.get('format', '').lower()
+    if fmt == 'ndjson':
+        return 'ndjson'
+    if NDJSON_MIMETYPE in request.accept_mimetypes.values():
+        return 'ndjson'
+    if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return 'json'
+    return None
+
+
+def iter_rows(cursor, batch_size=FETCH_BATCH_SIZE):
+    """Yield rows from an executed cursor without materialising the result"""
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        for row in rows:
+            yield row
+
+
+def _encode(row):
+    return json.dumps(dict(row), default=str)
+
+
+def _json_array_chunks(rows, key):
+    # Same envelope as the buffered jsonify() response
+    yield '{"success": true, "%s": [' % key
+    first = True
+    for row in rows:
+        if first:
+            first = False
+            yield _encode(row)
+        else:
+            yield ',' + _encode(row)
+    yield ']}\n'
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield _encode(row) + '\n'
+
+
+def stream_rows(conn, cursor, fmt, key):
+    """Stream an executed cursor as NDJSON or a JSON array.
+
+    The connection is closed (returned to the pool) once the body has been
+    sent or the client goes away.
+    """
+    def generate():
+        try:
+            rows = iter_rows(cursor)
+            if fmt == 'ndjson':
+                yield from ndjson_lines(rows)
+            else:
+                yield from _json_array_chunks(rows, key)
+        finally:
+            conn.close()
+
+    mimetype = NDJSON_MIMETYPE if fmt == 'ndjson' else 'application/json'
+    return Response(generate(), mimetype=mimetype)
+
+
+def coalesce(chunks, size=16384):
+    """Join small text chunks so the server writes about ``size`` characters at a time"""
+    pending = []
+    pending_size = 0
+    for chunk in chunks:
+        pending.append(chunk)
+        pending_size += len(chunk)
+        if pending_size >= size:
+            yield ''.join(pending)
+            pending = []
+            pending_size = 0
+    if pending:
+        yield ''.join(pending)
+
+
+def csv_chunks(columns, rows):
+    """CSV text for a header row and ``rows``, buffered into large chunks"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() > 16384:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def gzip_chunks(chunks, level=6):
+    """Gzip-compress a stream of text chunks incrementally (constant memory)"""
+    # wbits=31 writes a gzip header and trailer around the deflate stream
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_csv(conn, cursor, filename):
+    """Stream an executed cursor as a CSV download, header row first.
+
+    The connection is closed (returned to the pool) once the body has been
+    sent or the client goes away.
+    """
+    def generate():
+        try:
+            yield from csv_chunks([column[0] for column in cursor.description], iter_rows(cursor))
+        finally:
+            conn.close()
+
+    response = Response(generate(), mimetype='text/csv')
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
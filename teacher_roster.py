@@ -0,0 +1,180 @@
+import csv
+import io
+import re
+from datetime import datetime
+
+# Columns written by the roster export; an import needs name and pin, and
+# ignores columns it does not know (so an export can be edited and re-imported)
+EXPORT_COLUMNS = ['id', 'name', 'pin', 'role', 'status', 'created_at']
+REQUIRED_COLUMNS = ['name', 'pin']
+
+# Same choices as the RFID management form
+TEACHER_ROLES = ('teacher', 'staff', 'admin')
+TEACHER_STATUSES = ('active', 'inactive')
+PIN_PATTERN = re.compile(r'^[0-9]{4}$')
+
+# Column an imported row is matched on to find the teacher it updates
+MATCH_KEYS = ('name', 'pin')
+
+
+def read_roster(text):
+    """Parse CSV text into ``[(line_number, row), ...]``.
+
+    Header names are case-insensitive. Raises ValueError when the header is
+    missing a required column.
+    """
+    reader = csv.DictReader(io.StringIO(text.lstrip('\ufeff')))
+    if reader.fieldnames is None:
+        raise ValueError('CSV file is empty')
+    reader.fieldnames = [(name or '').strip().lower() for name in reader.fieldnames]
+    missing = [column for column in REQUIRED_COLUMNS if column not in reader.fieldnames]
+    if missing:
+        raise ValueError('CSV header is missing: ' + ', '.join(missing))
+
+    rows = []
+    for row in reader:
+        if not any((value or '').strip() for value in row.values() if isinstance(value, str)):
+            continue
+        rows.append((reader.line_num, row))
+    return rows
+
+
+def validate_row(row):
+    """Normalise one roster row; returns ``(teacher, errors)``"""
+    def value(column, default=''):
+        return (row.get(column) or '').strip() or default
+
+    teacher = {
+        'name': value('name'),
+        'pin': value('pin'),
+        'role': value('role', 'teacher').lower(),
+        'status': value('status', 'active').lower(),
+    }
+    errors = []
+    if not teacher['name']:
+        errors.append('name is required')
+    if not PIN_PATTERN.match(teacher['pin']):
+        errors.append('pin must be 4 digits')
+    if teacher['role'] not in TEACHER_ROLES:
+        errors.append('role must be one of ' + ', '.join(TEACHER_ROLES))
+    if teacher['status'] not in TEACHER_STATUSES:
+        errors.append('status must be one of ' + ', '.join(TEACHER_STATUSES))
+    return teacher, errors
+
+
+def match_key(teacher, match):
+    # Names are matched case-insensitively, PINs exactly
+    return teacher['name'].casefold() if match == 'name' else teacher['pin']
+
+
+def plan_import(conn, rows, match='name'):
+    """Work out what importing ``rows`` would do to teacher_keys.
+
+    Returns ``(report, inserts, updates)``: one report entry per row, and
+    the parameter tuples for the INSERT and UPDATE statements. Rows are
+    checked in file order against the roster as it stands after the rows
+    before them, so an active PIN can never end up with two owners.
+    """
+    existing = {}
+    by_key = {}
+    pin_owner = {}
+    for row in conn.execute('SELECT id, name, pin, role, status FROM teacher_keys ORDER BY id'):
+        teacher = {'name': row[1], 'pin': row[2], 'role': row[3], 'status': row[4]}
+        existing[row[0]] = teacher
+        # Oldest teacher wins when names or PINs already collide, like the PIN index
+        by_key.setdefault(match_key(teacher, match), row[0])
+        if teacher['status'] == 'active':
+            pin_owner.setdefault(teacher['pin'], row[0])
+
+    now = datetime.now()
+    report = []
+    inserts = []
+    updates = []
+    seen = {}
+    for line, row in rows:
+        teacher, errors = validate_row(row)
+        entry = {'line': line, 'name': teacher['name']}
+        key = match_key(teacher, match)
+
+        if not errors and key in seen:
+            errors.append(f'duplicate {match} (line {seen[key]})')
+        target = by_key.get(key)
+        owner = target if target is not None else ('line', line)
+        if not errors and teacher['status'] == 'active':
+            holder = pin_owner.get(teacher['pin'])
+            if holder is not None and holder != owner:
+                used_by = existing[holder]['name'] if holder in existing else f'line {holder[1]}'
+                errors.append(f'pin is already used by {used_by}')
+
+        if errors:
+            entry.update({'action': 'error', 'errors': errors})
+            report.append(entry)
+            continue
+        seen[key] = line
+
+        if target is not None:
+            entry['id'] = target
+            current = existing[target]
+            if pin_owner.get(current['pin']) == target:
+                del pin_owner[current['pin']]
+            if teacher == current:
+                entry['action'] = 'unchanged'
+            else:
+                entry['action'] = 'updated'
+                updates.append((teacher['name'], teacher['pin'], teacher['role'], teacher['status'], target))
+            existing[target] = teacher
+        else:
+            entry['action'] = 'created'
+            inserts.append((teacher['name'], teacher['pin'], teacher['role'], teacher['status'], now))
+        if teacher['status'] == 'active':
+            pin_owner[teacher['pin']] = owner
+        report.append(entry)
+    return report, inserts, updates
+
+
+def import_roster(conn, rows, match='name', dry_run=False, strict=False):
+    """Upsert roster rows into teacher_keys in a single transaction.
+
+    Valid rows are written with one executemany() per statement and one
+    commit, whatever the roster size. With ``strict`` nothing is written if
+    any row is invalid; with ``dry_run`` nothing is written at all.
+    Returns a summary with the per-row report.
+    """
+    if match not in MATCH_KEYS:
+        raise ValueError('match must be one of ' + ', '.join(MATCH_KEYS))
+
+    # Take the write lock before reading, so the plan cannot go stale
+    conn.execute('BEGIN' if dry_run else 'BEGIN IMMEDIATE')
+    try:
+        report, inserts, updates = plan_import(conn, rows, match)
+        failed = sum(1 for entry in report if entry['action'] == 'error')
+        write = not dry_run and not (strict and failed)
+        if write:
+            conn.executemany('''
+                INSERT INTO teacher_keys (name, pin, role, status, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', inserts)
+            conn.executemany('''
+                UPDATE teacher_keys SET name = ?, pin = ?, role = ?, status = ?
+                WHERE id = ?
+            ''', updates)
+            conn.commit()
+        else:
+            conn.rollback()
+    except BaseException:
+        conn.rollback()
+        raise
+
+    counts = {action: 0 for action in ('created', 'updated', 'unchanged', 'error')}
+    for entry in report:
+        counts[entry['action']] += 1
+    return {
+        'committed': write,
+        'dry_run': dry_run,
+        'match': match,
+        'created': counts['created'],
+        'updated': counts['updated'],
+        'unchanged': counts['unchanged'],
+        'errors': counts['error'],
+        'rows': report,
+    }
@@ -0,0 +1,117 @@
+import base64
+import io
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module  # noqa: E402
+from rate_limit import MemoryBucketStore  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path):
+    """The Flask app pointed at an empty database and upload folders in tmp_path"""
+    flask_app = app_module.app
+    overrides = {
+        'TESTING': True,
+        'DATABASE': str(tmp_path / 'hazard.db'),
+        'UPLOAD_FOLDER_BEFORE': str(tmp_path / 'uploads' / 'before'),
+        'UPLOAD_FOLDER_AFTER': str(tmp_path / 'uploads' / 'after'),
+        'THUMBNAIL_FOLDER': str(tmp_path / 'uploads' / 'thumbs'),
+        'UPLOAD_FOLDER_MAP_SCREENSHOTS': str(tmp_path / 'map_screenshots'),
+        'ACTIVITY_LOG_ASYNC': False,
+        'AUTH_RATE_LIMIT_ENABLED': True,
+    }
+    saved = {key: flask_app.config.get(key) for key in overrides}
+    flask_app.config.update(overrides)
+    for key in ('UPLOAD_FOLDER_BEFORE', 'UPLOAD_FOLDER_AFTER', 'THUMBNAIL_FOLDER', 'UPLOAD_FOLDER_MAP_SCREENSHOTS'):
+        os.makedirs(overrides[key], exist_ok=True)
+    app_module.init_db()
+
+    # Per-process caches still hold state from the previous test's database
+    app_module.pin_index._pid = None
+    store = MemoryBucketStore()
+    app_module.login_ip_limiter.store = store
+    app_module.login_credential_limiter.store = store
+    with app_module.cluster_index._lock:
+        app_module.cluster_index._cache.clear()
+        app_module.cluster_index._version = None
+
+    yield flask_app
+
+    # Write anything still pending into this test's database, not hazard.db
+    app_module.throttle_summary.flush()
+    app_module.activity_writer.flush()
+    app_module.file_deleter.flush()
+    flask_app.config.update(saved)
+
+
+@pytest.fixture
+def no_image_jobs(monkeypatch):
+    """Keep stored uploads exactly as sent (no background re-encoding)"""
+    monkeypatch.setattr(app_module.image_jobs, 'available', lambda: False)
+
+
+def png_bytes(color=(200, 30, 30)):
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8), color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def png_data_url(color=(200, 30, 30)):
+    return 'data:image/png;base64,' + base64.b64encode(png_bytes(color)).decode('ascii')
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin_client(app):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['admin_logged_in'] = True
+    return client
+
+
+@pytest.fixture
+def db(app):
+    conn = sqlite3.connect(app.config['DATABASE'])
+    conn.row_factory = sqlite3.Row
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def teacher(db):
+    cursor = db.execute(
+        "INSERT INTO teacher_keys (name, pin, role, status) VALUES ('Test Teacher', '1234', 'teacher', 'active')"
+    )
+    db.commit()
+    return cursor.lastrowid
+
+
+def insert_report(conn, **fields):
+    """Insert a hazard report with sensible defaults and return its id"""
+    values = {
+        'before_image': 'before.jpg',
+        'description': 'Broken railing',
+        'latitude': 14.5995,
+        'longitude': 120.9842,
+        'status': 'Pending',
+        'date_reported': '2024-01-01 08:00:00',
+        'user_name': 'Test Teacher',
+        'user_role': 'Teacher',
+    }
+    values.update(fields)
+    columns = ', '.join(values)
+    placeholders = ', '.join('?' * len(values))
+    cursor = conn.execute(f'INSERT INTO hazard_reports ({columns}) VALUES ({placeholders})', list(values.values()))
+    conn.commit()
+    return cursor.lastrowid
@@ -0,0 +1,52 @@
+import itertools
+
+import pytest
+
+from activity_query import EQUALITY_FILTERS, build_activity_query
+
+FILTER_COMBINATIONS = [
+    combination
+    for size in range(0, len(EQUALITY_FILTERS) + 1)
+    for combination in itertools.combinations(EQUALITY_FILTERS, size)
+]
+
+
+def query_plan(db, args, dense_prefix=False):
+    sql, params = build_activity_query(args, 101, dense_prefix)
+    return ' '.join(row[3] for row in db.execute('EXPLAIN QUERY PLAN ' + sql, params))
+
+
+@pytest.mark.parametrize('prefix', [None, 'LOGIN_'])
+@pytest.mark.parametrize('filters', FILTER_COMBINATIONS)
+def test_filtered_pages_are_read_in_timestamp_order(db, filters, prefix):
+    args = {name: '1' for name in filters}
+    args['from'] = '2024-01-01'
+    if prefix:
+        args['action_prefix'] = prefix
+    plan = query_plan(db, args, dense_prefix=bool(prefix) and not filters)
+
+    assert 'TEMP B-TREE' not in plan
+    for name in filters:
+        assert f'{EQUALITY_FILTERS[name]}=?' in plan
+
+
+def test_sparse_prefix_uses_the_action_index(db):
+    plan = query_plan(db, {'action_prefix': 'LOGIN_FAILED_'})
+    assert 'idx_user_activity_action_time' in plan
+
+
+def test_activity_pages(admin_client, db):
+    db.executemany(
+        'INSERT INTO user_activity (user_id, user_name, user_role, action, timestamp) VALUES (?, ?, ?, ?, ?)',
+        [(1, 'T', 'teacher', action, f'2024-01-01 08:00:{second:02d}')
+         for second, action in enumerate(['LOGIN_PIN', 'LOGOUT', 'LOGIN_FAILED_PIN', 'LOGIN_PIN'])]
+    )
+    db.commit()
+
+    body = admin_client.get('/api/user-activity', query_string={'user_id': 1, 'action_prefix': 'LOGIN_', 'limit': 2}).get_json()
+    assert [row['action'] for row in body['activities']] == ['LOGIN_PIN', 'LOGIN_FAILED_PIN']
+    body = admin_client.get('/api/user-activity', query_string={
+        'user_id': 1, 'action_prefix': 'LOGIN_', 'limit': 2, 'cursor': body['next_cursor'],
+    }).get_json()
+    assert [row['action'] for row in body['activities']] == ['LOGIN_PIN']
+    assert body['next_cursor'] is None
@@ -0,0 +1,25 @@
+import pytest
+
+
+@pytest.mark.parametrize('pin', [1234, '1234', ' 1234 '])
+def test_verify_pin_accepts_numeric_and_string_pins(client, teacher, pin):
+    response = client.post('/api/rfid/verify-pin', json={'pin': pin})
+    assert response.status_code == 200
+    assert response.get_json()['valid'] is True
+    assert response.get_json()['teacher']['id'] == teacher
+
+
+@pytest.mark.parametrize('field', ['pin', 'teacher_pin'])
+def test_rfid_authenticate_accepts_numeric_pin(client, teacher, field):
+    response = client.post('/rfid-authenticate', json={field: 1234})
+    assert response.get_json()['success'] is True
+
+
+def test_wrong_pin_is_rejected(client, teacher):
+    response = client.post('/api/rfid/verify-pin', json={'pin': 4321})
+    assert response.get_json()['valid'] is False
+
+
+def test_missing_credentials(client, teacher):
+    response = client.post('/api/rfid/verify-pin', json={'pin': '  '})
+    assert response.status_code == 400
@@ -0,0 +1,64 @@
+import io
+import os
+
+import app as app_module
+from conftest import insert_report, png_bytes
+
+
+def test_bulk_resolve_reports_unknown_ids(admin_client, db):
+    first = insert_report(db)
+    second = insert_report(db, status='Resolved')
+
+    response = admin_client.post('/admin/bulk-resolve', json={'ids': [first, 999, second]})
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body['success'] is False
+    assert body['resolved'] == 1
+    assert body['failed'] == 1
+    assert [result['result'] for result in body['results']] == ['resolved', 'not_found', 'already_resolved']
+    assert db.execute('SELECT status FROM hazard_reports WHERE id = ?', (first,)).fetchone()[0] == 'Resolved'
+
+
+def test_bulk_resolve_removes_an_unused_photo(app, admin_client, db, no_image_jobs):
+    deleted = app_module.file_deleter.stats()['deleted']
+    response = admin_client.post('/admin/bulk-resolve', data={
+        'ids': '998,999',
+        'after_image': (io.BytesIO(png_bytes()), 'after.png'),
+    })
+    assert response.get_json()['resolved'] == 0
+
+    app_module.file_deleter.flush()
+    assert os.listdir(app.config['UPLOAD_FOLDER_AFTER']) == []
+    assert app_module.file_deleter.stats()['deleted'] == deleted + 1
+    assert db.execute('SELECT COUNT(*) FROM image_refs').fetchone()[0] == 0
+
+
+def test_bulk_resolve_with_photo(app, admin_client, db, no_image_jobs):
+    ids = [insert_report(db), insert_report(db)]
+    response = admin_client.post('/admin/bulk-resolve', data={
+        'ids': ','.join(map(str, ids)),
+        'after_image': (io.BytesIO(png_bytes()), 'after.png'),
+    })
+    assert response.get_json()['resolved'] == 2
+
+    rows = db.execute('SELECT DISTINCT after_image FROM hazard_reports').fetchall()
+    assert len(rows) == 1
+    app_module.file_deleter.flush()
+    assert os.listdir(app.config['UPLOAD_FOLDER_AFTER']) == [rows[0][0]]
+
+
+def test_bulk_delete_reports_unknown_ids(admin_client, db):
+    report_id = insert_report(db)
+
+    response = admin_client.post('/admin/bulk-delete', json={'ids': f'{report_id},999'})
+    body = response.get_json()
+    assert body['deleted'] == 1
+    assert body['failed'] == 1
+    assert body['results'] == [{'id': report_id, 'result': 'deleted'}, {'id': 999, 'result': 'not_found'}]
+    assert db.execute('SELECT COUNT(*) FROM hazard_reports').fetchone()[0] == 0
+
+
+def test_bulk_endpoints_validate_ids(client, admin_client):
+    assert client.post('/admin/bulk-delete', json={'ids': [1]}).status_code == 401
+    assert admin_client.post('/admin/bulk-delete', json={'ids': []}).status_code == 400
+    assert admin_client.post('/admin/bulk-resolve', json={'ids': ['x']}).status_code == 400
@@ -0,0 +1,45 @@
+from conftest import insert_report
+
+
+def clusters(client, zoom, bbox):
+    response = client.get('/api/reports/clusters', query_string={'zoom': zoom, 'bbox': bbox})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_nearby_reports_form_one_cluster(client, db):
+    insert_report(db, latitude=14.60, longitude=121.00)
+    insert_report(db, latitude=14.61, longitude=121.01, status='Resolved')
+    lone = insert_report(db, latitude=-33.9, longitude=18.4)
+
+    body = clusters(client, 3, '-180,-90,180,90')
+    assert body['total'] == 3
+    by_count = sorted(body['clusters'], key=lambda cluster: cluster['count'])
+    assert by_count[0]['id'] == lone
+    assert by_count[1]['count'] == 2
+    assert by_count[1]['statuses'] == {'Pending': 1, 'Resolved': 1}
+    assert 'id' not in by_count[1]
+
+
+def test_reports_just_outside_the_tiles_are_left_out(client, db):
+    # zoom 1: tiles are 180 degrees wide, the first one ends at longitude 0
+    insert_report(db, latitude=10.0, longitude=-0.0000001)
+    insert_report(db, latitude=11.0, longitude=0.0000001)
+
+    body = clusters(client, 1, '-10,0,-1,20')
+    assert body['total'] == 1
+    assert body['clusters'][0]['lat'] == 10.0
+
+
+def test_cache_is_dropped_when_reports_change(client, db):
+    insert_report(db, latitude=14.6, longitude=121.0)
+    assert clusters(client, 5, '120,14,122,15')['total'] == 1
+
+    insert_report(db, latitude=14.6, longitude=121.0)
+    assert clusters(client, 5, '120,14,122,15')['total'] == 2
+
+
+def test_invalid_requests(client):
+    assert client.get('/api/reports/clusters', query_string={'zoom': 3}).status_code == 400
+    assert client.get('/api/reports/clusters', query_string={'zoom': 99, 'bbox': '0,0,1,1'}).status_code == 400
+    assert client.get('/api/reports/clusters', query_string={'zoom': 20, 'bbox': '-180,-90,180,90'}).status_code == 400
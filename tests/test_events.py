@@ -0,0 +1,21 @@
+import app as app_module
+from config import Config
+
+
+def test_stream_cap_leaves_threads_for_requests():
+    assert 1 <= Config.EVENTS_MAX_SUBSCRIBERS <= Config.WEB_THREADS // 2
+
+
+def test_refused_stream_is_503(admin_client, monkeypatch):
+    monkeypatch.setattr(app_module.event_hub, 'max_subscribers', 0)
+    response = admin_client.get('/api/events')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '30'
+
+
+def test_dashboards_fall_back_to_polling(admin_client):
+    threaded = {'wsgi.multithread': True}
+    for url in ('/admin/dashboard', '/admin/rfid-management'):
+        page = admin_client.get(url, environ_overrides=threaded).get_data(as_text=True)
+        assert 'subscribeToEvents();' in page
+        assert 'events.onerror' in page and 'startPolling();' in page
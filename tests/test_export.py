@@ -0,0 +1,73 @@
+import csv
+import gzip
+import io
+import json
+
+from conftest import insert_report
+
+
+def seed(db):
+    first = insert_report(db, description='Cracked wall, east wing', rfid_code='CARD-1')
+    second = insert_report(db, status='Resolved', date_reported='2024-02-01 08:00:00')
+    return first, second
+
+
+def test_export_csv(admin_client, db):
+    first, second = seed(db)
+    response = admin_client.get('/api/reports/export')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert 'hazard_reports.csv' in response.headers['Content-Disposition']
+
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [int(row['id']) for row in rows] == [second, first]
+    assert rows[1]['description'] == 'Cracked wall, east wing'
+    assert 'rfid_code' not in rows[0]
+
+
+def test_export_geojson(admin_client, db):
+    first, _ = seed(db)
+    response = admin_client.get('/api/reports/export', query_string={'format': 'geojson', 'status': 'Pending'})
+    assert response.mimetype == 'application/geo+json'
+
+    collection = json.loads(response.get_data(as_text=True))
+    assert collection['type'] == 'FeatureCollection'
+    [feature] = collection['features']
+    assert feature['id'] == first
+    assert feature['geometry'] == {'type': 'Point', 'coordinates': [120.9842, 14.5995]}
+    assert 'rfid_code' not in feature['properties']
+
+
+def test_export_gzipped_ndjson(admin_client, db):
+    seed(db)
+    response = admin_client.get('/api/reports/export', query_string={'format': 'ndjson', 'gzip': '1'})
+    assert response.mimetype == 'application/gzip'
+    assert 'hazard_reports.ndjson.gz' in response.headers['Content-Disposition']
+
+    lines = gzip.decompress(response.get_data()).decode('utf-8').splitlines()
+    assert [json.loads(line)['status'] for line in lines] == ['Resolved', 'Pending']
+
+
+def test_export_requires_admin_and_a_known_format(client, admin_client):
+    assert client.get('/api/reports/export').status_code == 401
+    assert admin_client.get('/api/reports/export', query_string={'format': 'xml'}).status_code == 400
+
+
+def test_cli_export_matches_http_export(app, admin_client, db, tmp_path):
+    seed(db)
+    wanted = insert_report(db, user_role='student', user_name='Ana', latitude=14.6001, longitude=120.9846)
+    insert_report(db, user_role='teacher', user_name='Ana', latitude=14.6001, longitude=120.9846)
+    insert_report(db, user_role='student', user_name='Ana', latitude=14.70, longitude=121.10)
+    filters = {'status': 'Pending', 'role': 'student', 'reporter': 'Ana',
+               'near': '14.6,120.9845', 'radius': '200'}
+
+    response = admin_client.get('/api/reports/export', query_string=dict(filters, format='ndjson'))
+    out = tmp_path / 'reports.ndjson'
+    args = ['export-reports', '--format', 'ndjson', '--output', str(out)]
+    for name, value in filters.items():
+        args += [f'--{name}', value]
+    result = app.test_cli_runner().invoke(args=args)
+
+    assert result.exit_code == 0, result.output
+    assert out.read_text() == response.get_data(as_text=True)
+    assert [json.loads(line)['id'] for line in out.read_text().splitlines()] == [wanted]
@@ -0,0 +1,103 @@
+import base64
+import io
+import os
+
+import pytest
+
+import app as app_module
+from conftest import insert_report, png_bytes, png_data_url
+
+
+def stored_files(app, folder):
+    app_module.file_deleter.flush()
+    return sorted(name for name in os.listdir(app.config[folder]) if not name.startswith('.'))
+
+
+def test_resolve_unknown_report_is_404_and_stores_nothing(app, admin_client, no_image_jobs):
+    response = admin_client.post('/admin/resolve/999', json={'after_image': png_data_url()})
+    assert response.status_code == 404
+    assert stored_files(app, 'UPLOAD_FOLDER_AFTER') == []
+
+
+def test_resolve_keeps_the_after_image(app, admin_client, db, no_image_jobs):
+    report_id = insert_report(db)
+    response = admin_client.post(f'/admin/resolve/{report_id}', json={'after_image': png_data_url()})
+    assert response.status_code == 200
+
+    after_image = db.execute('SELECT after_image FROM hazard_reports WHERE id = ?', (report_id,)).fetchone()[0]
+    assert stored_files(app, 'UPLOAD_FOLDER_AFTER') == [after_image]
+    refcount = db.execute("SELECT refcount FROM image_refs WHERE folder = 'after' AND filename = ?", (after_image,))
+    assert refcount.fetchone()[0] == 1
+
+
+def test_queued_delete_skips_an_image_referenced_again(app, admin_client, db, no_image_jobs):
+    first = insert_report(db)
+    admin_client.post(f'/admin/resolve/{first}', json={'after_image': png_data_url()})
+    after_image = db.execute('SELECT after_image FROM hazard_reports WHERE id = ?', (first,)).fetchone()[0]
+
+    # The file was judged orphaned, but is in use again by the time the
+    # deleter gets to it
+    with app.test_request_context():
+        app_module.remove_orphaned_images([('after', after_image)])
+    assert stored_files(app, 'UPLOAD_FOLDER_AFTER') == [after_image]
+
+    db.execute('DELETE FROM hazard_reports WHERE id = ?', (first,))
+    db.commit()
+    with app.test_request_context():
+        app_module.remove_orphaned_images([('after', after_image)])
+    assert stored_files(app, 'UPLOAD_FOLDER_AFTER') == []
+
+
+@pytest.fixture
+def thread_image_jobs(monkeypatch):
+    app_module.image_jobs.shutdown()
+    monkeypatch.setattr(app_module.image_jobs, 'mode', 'thread')
+    yield app_module.image_jobs
+    app_module.image_jobs.shutdown()
+
+
+def jpeg_with_exif_data_url(color):
+    from PIL import Image
+    exif = Image.Exif()
+    exif[0x010f] = 'Camera Maker'
+    buffer = io.BytesIO()
+    Image.new('RGB', (16, 16), color).save(buffer, 'JPEG', exif=exif.tobytes())
+    return 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+def test_attached_photos_are_processed(app, admin_client, db, thread_image_jobs):
+    from PIL import Image
+    admin_client.post('/api/report', json={
+        'before_image': jpeg_with_exif_data_url((10, 20, 30)),
+        'description': 'Loose tiles', 'latitude': 14.6, 'longitude': 121.0,
+    })
+    response = admin_client.post('/api/report', json={
+        'before_image': jpeg_with_exif_data_url((200, 20, 30)),
+        'description': 'Loose tiles', 'latitude': 14.6, 'longitude': 121.0,
+        'duplicate_mode': 'attach',
+    })
+    assert response.get_json()['attached'] is True
+    thread_image_jobs.shutdown()
+
+    attachment = db.execute('SELECT before_image, processing_state FROM report_attachments').fetchone()
+    assert attachment['processing_state'] == 'done'
+    with Image.open(os.path.join(app.config['UPLOAD_FOLDER_BEFORE'], attachment['before_image'])) as image:
+        assert not image.getexif()
+
+
+def test_report_photo_as_multipart_or_raw_body(app, client, teacher, no_image_jobs):
+    assert client.post('/api/rfid/verify-pin', json={'pin': '1234'}).get_json()['valid'] is True
+    fields = {'description': 'Broken step', 'latitude': '14.6', 'longitude': '121.0'}
+
+    multipart = client.post('/api/report', data=dict(fields, before_image=(io.BytesIO(png_bytes()), 'step.png')))
+    assert multipart.status_code == 200
+
+    raw = client.post('/api/report', query_string=fields, data=png_bytes((0, 90, 0)), content_type='image/png')
+    assert raw.status_code == 200
+    assert len(stored_files(app, 'UPLOAD_FOLDER_BEFORE')) == 2
+
+
+def test_image_pool_is_bounded_per_web_worker():
+    from config import Config
+    assert 1 <= Config.IMAGE_JOB_WORKERS <= 2
+    assert app_module.image_jobs.max_workers == app_module.app.config['IMAGE_JOB_WORKERS']
@@ -0,0 +1,38 @@
+import app as app_module
+
+
+def test_failed_logins_are_throttled_with_retry_after(app, client, teacher):
+    for _ in range(app.config['AUTH_CREDENTIAL_BURST']):
+        response = client.post('/api/rfid/verify-pin', json={'pin': '9999'})
+        assert response.status_code == 200
+
+    response = client.post('/api/rfid/verify-pin', json={'pin': '9999'})
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+    assert response.get_json()['valid'] is False
+
+
+def test_failed_logins_from_one_address_are_throttled(client, teacher, monkeypatch):
+    monkeypatch.setattr(app_module.login_ip_limiter, 'burst', 3)
+    for pin in ('1111', '2222', '3333'):
+        assert client.post('/rfid-authenticate', json={'pin': pin}).status_code == 200
+
+    response = client.post('/rfid-authenticate', json={'pin': '4444'})
+    assert response.status_code == 429
+    assert 'Retry-After' in response.headers
+
+
+def test_successful_logins_do_not_use_up_the_ip_bucket(client, db, monkeypatch):
+    monkeypatch.setattr(app_module.login_ip_limiter, 'burst', 3)
+    # Distinct teachers so no per-credential bucket runs out
+    for number in range(10):
+        db.execute(
+            "INSERT INTO teacher_keys (name, pin, role, status) VALUES (?, ?, 'teacher', 'active')",
+            (f'Teacher {number}', str(5000 + number))
+        )
+    db.commit()
+
+    for number in range(10):
+        response = client.post('/api/rfid/verify-pin', json={'pin': 5000 + number})
+        assert response.status_code == 200
+        assert response.get_json()['valid'] is True
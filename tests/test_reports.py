@@ -0,0 +1,61 @@
+import itertools
+
+import pytest
+
+from conftest import insert_report
+from report_query import EQUALITY_FILTERS, build_report_query
+
+
+@pytest.mark.parametrize('filters', [
+    combination
+    for size in range(1, len(EQUALITY_FILTERS) + 1)
+    for combination in itertools.combinations(EQUALITY_FILTERS, size)
+])
+def test_every_filter_combination_pages_from_an_index(db, filters):
+    args = {name: 'x' for name in filters}
+    args['cursor'] = 'WyIyMDI0LTAxLTAxIDAwOjAwOjAwIiwgMV0'
+    sql, params = build_report_query(args, 50)
+    plan = ' '.join(row[3] for row in db.execute('EXPLAIN QUERY PLAN ' + sql, params))
+    assert 'TEMP B-TREE' not in plan
+    for name in filters:
+        assert f'{EQUALITY_FILTERS[name]}=?' in plan
+
+
+def test_keyset_pages_split_rows_with_the_same_timestamp(client, db):
+    # Five reports share one timestamp, so the page boundary falls between
+    # rows that only the id tells apart
+    ids = [insert_report(db, date_reported='2024-03-01 09:00:00') for _ in range(5)]
+    ids.append(insert_report(db, date_reported='2024-02-01 09:00:00'))
+
+    seen = []
+    cursor = None
+    while True:
+        query = {'limit': 2}
+        if cursor:
+            query['cursor'] = cursor
+        body = client.get('/api/reports', query_string=query).get_json()
+        seen.extend(report['id'] for report in body['reports'])
+        cursor = body.get('next_cursor')
+        if not cursor:
+            break
+
+    assert seen == sorted(ids[:5], reverse=True) + [ids[5]]
+
+
+def test_invalid_cursor_is_rejected(client):
+    assert client.get('/api/reports', query_string={'cursor': 'not-a-cursor'}).status_code == 400
+
+
+def test_listing_varies_on_accept(client, db):
+    insert_report(db)
+    response = client.get('/api/reports')
+    assert 'Accept' in response.vary
+
+    ndjson = client.get('/api/reports', headers={'Accept': 'application/x-ndjson'})
+    assert ndjson.mimetype == 'application/x-ndjson'
+    assert 'Accept' in ndjson.vary
+    assert ndjson.headers['ETag'] != response.headers['ETag']
+
+    cached = client.get('/api/reports', headers={'If-None-Match': response.headers['ETag']})
+    assert cached.status_code == 304
+    assert 'Accept' in cached.vary
@@ -0,0 +1,29 @@
+from activity_retention import action_count, hourly_activity, prune_activity
+
+
+def test_action_count():
+    assert action_count('LOGIN_THROTTLED:credential:pin:12 x7') == 7
+    assert action_count('LOGIN_THROTTLED:ip x1') == 1
+    assert action_count('LOGIN_SUCCESS_PIN') == 1
+    assert action_count('SUBMIT_REPORT:12 x3') == 1
+
+
+def test_prune_counts_throttled_attempts(db, tmp_path):
+    db.executemany(
+        'INSERT INTO user_activity (user_id, user_name, user_role, action, timestamp) VALUES (?, ?, ?, ?, ?)',
+        [
+            (0, 'Unknown', 'Unknown', 'LOGIN_THROTTLED:ip x12', '2020-01-01 08:10:00'),
+            (0, 'Unknown', 'Unknown', 'LOGIN_THROTTLED:credential:pin x3', '2020-01-01 08:40:00'),
+            (1, 'T', 'teacher', 'LOGIN_SUCCESS_PIN', '2020-01-01 08:50:00'),
+            (1, 'T', 'teacher', 'LOGIN_SUCCESS_PIN', '2030-01-01 08:50:00'),
+        ]
+    )
+    db.commit()
+
+    pruned, archive = prune_activity(db, '2021-01-01 00:00:00', str(tmp_path / 'archive'), pause=0)
+    assert pruned == 3
+    assert archive is not None
+
+    counts = {row['action']: row['count'] for row in hourly_activity(db)}
+    assert counts == {'LOGIN_THROTTLED': 15, 'LOGIN_SUCCESS_PIN': 1}
+    assert db.execute('SELECT COUNT(*) FROM user_activity').fetchone()[0] == 1
@@ -0,0 +1,66 @@
+import gzip
+import os
+import subprocess
+import sys
+
+from werkzeug.datastructures import Accept
+from werkzeug.http import parse_accept_header
+
+import app as app_module
+from rfid_shell import RfidShell, negotiate_encoding
+
+
+def accept(value):
+    return parse_accept_header(value, Accept)
+
+
+def test_negotiate_does_not_write_files(tmp_path):
+    path = tmp_path / 'index.js'
+    path.write_text('console.log("hi")')
+
+    assert negotiate_encoding(str(path), accept('gzip')) == (str(path), None)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['index.js']
+
+
+def test_precompress_assets_writes_gzip_siblings(tmp_path):
+    (tmp_path / 'index.js').write_text('console.log("hi")' * 100)
+    (tmp_path / 'logo.png').write_bytes(b'\x89PNG')
+    shell = RfidShell(str(tmp_path / 'RFID.html'), str(tmp_path))
+
+    assert shell.precompress_assets() == 1
+    names = sorted(p.name for p in tmp_path.iterdir())
+    assert 'index.js.gz' in names
+    assert not any(name.endswith('.tmp') for name in names)
+    assert gzip.decompress((tmp_path / 'index.js.gz').read_bytes()) == (tmp_path / 'index.js').read_bytes()
+
+    send_path, encoding = negotiate_encoding(str(tmp_path / 'index.js'), accept('gzip'))
+    assert encoding == 'gzip' and send_path.endswith('.gz')
+
+
+def test_assets_vary_on_accept_encoding(client):
+    name = next(name for name in sorted(os.listdir(app_module.rfid_shell.assets_dir)) if name.endswith('.js'))
+
+    compressed = client.get(f'/static/rfid/assets/{name}', headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in compressed.vary
+
+    plain = client.get(f'/static/rfid/assets/{name}')
+    assert 'Content-Encoding' not in plain.headers
+    assert 'Accept-Encoding' in plain.vary
+
+
+
+def test_app_imports_when_assets_cannot_be_written():
+    # A fresh interpreter, since the precompress step runs when app is imported
+    script = (
+        'import rfid_shell\n'
+        'def refuse(path):\n'
+        '    raise PermissionError(13, "Permission denied", path)\n'
+        'rfid_shell.precompress = refuse\n'
+        'import app\n'
+        'print("imported")\n'
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, '-c', script], cwd=root, capture_output=True, text=True)
+    assert 'imported' in result.stdout, result.stderr
+    assert 'Could not precompress RFID assets' in result.stdout
@@ -0,0 +1,57 @@
+import pytest
+
+from teacher_roster import import_roster, plan_import, read_roster
+
+
+def roster(*lines):
+    return read_roster('\n'.join(('name,pin,role,status',) + lines) + '\n')
+
+
+def teachers(db):
+    return [tuple(row) for row in db.execute('SELECT name, pin, role, status FROM teacher_keys ORDER BY id')]
+
+
+def test_pin_held_by_another_teacher_is_rejected_per_row(db, teacher):
+    report, inserts, updates = plan_import(db, roster('Maria Santos,1234,teacher,active',
+                                                      'Jose Reyes,5678,staff,active'))
+    assert report[0]['action'] == 'error'
+    assert report[0]['errors'] == ['pin is already used by Test Teacher']
+    assert report[1]['action'] == 'created'
+    assert [row[:4] for row in inserts] == [('Jose Reyes', '5678', 'staff', 'active')]
+    assert updates == []
+
+
+def test_pin_repeated_within_one_file_is_rejected(db):
+    report, inserts, _ = plan_import(db, roster('Maria Santos,4321,teacher,active',
+                                                'Jose Reyes,4321,teacher,active'))
+    assert [entry['action'] for entry in report] == ['created', 'error']
+    assert report[1]['errors'] == ['pin is already used by line 2']
+    assert len(inserts) == 1
+
+
+def test_dry_run_leaves_the_table_unchanged(db, teacher):
+    before = teachers(db)
+    summary = import_roster(db, roster('Test Teacher,1234,admin,active',
+                                       'Maria Santos,4321,teacher,active'), dry_run=True)
+    assert summary['committed'] is False
+    assert (summary['created'], summary['updated']) == (1, 1)
+    assert teachers(db) == before
+
+
+def test_strict_failure_rolls_back_the_whole_file(db, teacher):
+    before = teachers(db)
+    summary = import_roster(db, roster('Maria Santos,4321,teacher,active',
+                                       'Jose Reyes,1234,teacher,active'), strict=True)
+    assert summary['committed'] is False
+    assert (summary['created'], summary['errors']) == (1, 1)
+    assert teachers(db) == before
+
+    summary = import_roster(db, roster('Maria Santos,4321,teacher,active',
+                                       'Jose Reyes,1234,teacher,active'))
+    assert summary['committed'] is True
+    assert teachers(db) == before + [('Maria Santos', '4321', 'teacher', 'active')]
+
+
+def test_unknown_match_key_is_rejected(db):
+    with pytest.raises(ValueError):
+        import_roster(db, roster('Maria Santos,4321,teacher,active'), match='email')
@@ -0,0 +1,12 @@
+from conftest import insert_report
+
+
+def test_bbox_excludes_points_just_outside(client, db):
+    # 14.6000001 rounds into the R*Tree box of a 14.6 edge as a 32-bit float
+    inside = insert_report(db, latitude=14.6, longitude=121.0)
+    insert_report(db, latitude=14.6000001, longitude=121.0)
+    insert_report(db, latitude=14.5, longitude=121.0000001)
+
+    body = client.get('/api/reports', query_string={'bbox': '120.9,14.5000001,121.0,14.6'}).get_json()
+    assert [report['id'] for report in body['reports']] == [inside]
+
@@ -0,0 +1,24 @@
+import app as app_module
+from conftest import insert_report
+
+
+def test_status_counts_follow_report_changes(admin_client, db):
+    first = insert_report(db)
+    insert_report(db)
+    db.execute("UPDATE hazard_reports SET status = 'Resolved', date_resolved = '2024-01-01 10:00:00' WHERE id = ?", (first,))
+    db.commit()
+
+    body = admin_client.get('/api/stats').get_json()
+    assert body['by_status'] == {'Pending': 1, 'Resolved': 1, 'total': 2}
+
+    db.execute('DELETE FROM hazard_reports WHERE id = ?', (first,))
+    db.commit()
+    body = admin_client.get('/api/stats').get_json()
+    assert body['by_status'] == {'Pending': 1, 'Resolved': 0, 'total': 1}
+
+
+def test_dashboard_renders_the_summary_counts(app, admin_client, db):
+    insert_report(db)
+    with app.app_context():
+        assert app_module.report_status_counts() == {'Pending': 1, 'Resolved': 0, 'total': 1}
+    assert admin_client.get('/admin/dashboard').status_code == 200
@@ -0,0 +1,61 @@
+import os
+import tempfile
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; originals are served without it
+    Image = None
+    ImageOps = None
+
+# Output formats for derivatives: url name -> (Pillow format, mimetype)
+THUMBNAIL_FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+}
+
+
+def thumbnails_available():
+    """True when Pillow is installed and derivatives can be generated"""
+    return Image is not None
+
+
+def thumbnail_path(cache_dir, folder, filename, width, fmt):
+    """Cache location of a derivative.
+
+    Source files are content-addressed, so the source name (its hash) plus
+    the width and format identify a derivative uniquely and it never needs
+    invalidating.
+    """
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    return os.path.join(cache_dir, folder, f'{stem}_{width}.{fmt}')
+
+
+def render_thumbnail(source_path, dest_path, width, fmt, quality):
+    """Write a ``width``-pixel-wide derivative of ``source_path``"""
+    pil_format, _ = THUMBNAIL_FORMATS[fmt]
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.LANCZOS)
+        if pil_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dest_path), prefix='.thumb-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                image.save(f, pil_format, quality=quality, optimize=True)
+            os.replace(tmp_path, dest_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+def get_thumbnail(source_path, cache_dir, folder, filename, width, fmt, quality):
+    """Path of the cached derivative, generating it on first request"""
+    dest_path = thumbnail_path(cache_dir, folder, filename, width, fmt)
+    if not os.path.exists(dest_path):
+        render_thumbnail(source_path, dest_path, width, fmt, quality)
+    return dest_path